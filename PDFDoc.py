@@ -1,11 +1,22 @@
 #!/usr/bin/env python
 
 # standard library import
+from collections import namedtuple
 
 # third party related import
 
 # local library import
-from parser import PDFParser
+from pdfproto.page.PDFPageTree import PDFPageTree, PDFPageTreeError
+from pdfproto.parser.PDFParser import PDFParser, PDFParserError
+
+
+class PDFDocError(Exception): pass
+
+
+PDFMetadata = namedtuple(
+                '_PDFMetadata',
+                ('version', 'info', 'id', 'page_count', 'encrypted')
+              )
 
 
 class PDFDoc:
@@ -15,6 +26,10 @@ class PDFDoc:
 
     Attributes:
         parser: An instance of PDFParser.
+        catalog: A dict of the document catalog.
+        pages: An instance of PDFPageTree, the pages are parsed when
+            they are read.
+        page_count: An integer of the number of pages.
 
     """
 
@@ -23,10 +38,87 @@ class PDFDoc:
         self.name = None
         self.parser = None
         self.pages = []
+        self._catalog = None
+
+    def open(self, name, recover=False):
+        """Open a pdf file.
+
+        Args:
+            name: A string denotes the pdf filename.
+            recover: If True, broken cross reference tables are rebuilt
+                by scanning the file, see PDFParser.
+
+        """
+
+        self._open_parser(name, recover)
+
+        self.pages = PDFPageTree(self.parser, self.catalog.get('Pages'))
+
+    def open_metadata(self, name, recover=False):
+        """Open a pdf file only to read its metadata.
+
+        Only the newest cross reference table and the few objects of
+        the metadata are read, older tables are read only if the newest
+        one does not have these objects.
+
+        Args:
+            name: A string denotes the pdf filename.
+            recover: See open.
+
+        Returns:
+            A PDFMetadata of the version in the header, the document
+            information dictionary, the file identifiers, the number of
+            pages, and whether the document is encrypted. Missing or
+            invalid fields are None.
 
-    def open(self, name):
-        """Open a pdf file."""
+        """
+
+        self._open_parser(name, recover)
+
+        try:
+            version = self.parser.get_header()[5:]
+        except PDFParserError, e:
+            version = None
+
+        trailer = self.parser.trailer
+
+        info = None
+        if isinstance(trailer.info, tuple):
+            info_obj = self.parser.get_object(*trailer.info)
+            if info_obj is not None and isinstance(info_obj.data, dict):
+                info = info_obj.data
+
+        try:
+            page_count = len(PDFPageTree(self.parser,
+                                         self.catalog.get('Pages')))
+        except (PDFDocError, PDFPageTreeError), e:
+            page_count = None
+
+        return PDFMetadata(version, info, trailer.id, page_count,
+                           trailer.encrypt is not None)
+
+    def _open_parser(self, name, recover):
 
         self.name = name
-        self.parser = PDFParser()
-        self.parser.open(name)
\ No newline at end of file
+        self.parser = PDFParser(recover=recover)
+        self.parser.open(name)
+        self._catalog = None
+
+    @property
+    def catalog(self):
+
+        if self._catalog is None:
+            root = self.parser.trailer.root
+            root = (self.parser.get_object(*root)
+                    if isinstance(root, tuple) else None)
+            if root is None or not isinstance(root.data, dict):
+                raise PDFDocError('Should be a catalog dictionary')
+
+            self._catalog = root.data
+
+        return self._catalog
+
+    @property
+    def page_count(self):
+
+        return len(self.pages)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+# standard library import
+
+# third party related import
+
+# local library import
+
+
+class PDFPage(object):
+    """A page object (7.7.3.3).
+
+    The attributes inherited from the ancestor page tree nodes (7.7.3.4)
+    are looked up when they are read.
+
+    Attributes:
+        ref: The (object_number, generation_number) of the page.
+        data: A dict of the page object.
+        ancestors: A list of dicts of the page tree nodes above the
+            page, the parent first.
+        resources: The resource dictionary, inheritable.
+        media_box: The MediaBox rectangle, inheritable.
+        crop_box: The CropBox rectangle, inheritable. It defaults to
+            the MediaBox.
+        rotate: The Rotate integer, inheritable. It defaults to 0.
+
+    """
+
+    # 7.7.3.4 Table 30
+    INHERITABLE_KEYS = frozenset(['Resources', 'MediaBox', 'CropBox',
+                                  'Rotate'])
+
+    def __init__(self, ref, data, ancestors, resolve):
+        """
+        Args:
+            ref: The (object_number, generation_number) of the page.
+            data: A dict of the page object.
+            ancestors: A list of dicts of the page tree nodes above the
+                page, the parent first.
+            resolve: A callable which returns the value of an indirect
+                reference, or any other value as it is.
+
+        """
+
+        self.ref = ref
+        self.data = data
+        self.ancestors = ancestors
+        self._resolve = resolve
+
+    def get(self, key, default=None):
+        """Get the resolved value of an entry of the page object."""
+
+        if key not in self.data:
+            return default
+
+        return self._resolve(self.data[key])
+
+    def get_inherited(self, key, default=None):
+        """Get the resolved value of an entry of the page object, or of
+        the nearest ancestor which has it."""
+
+        for node in [self.data] + self.ancestors:
+            if key in node:
+                return self._resolve(node[key])
+
+        return default
+
+    @property
+    def resources(self):
+
+        return self.get_inherited('Resources')
+
+    @property
+    def media_box(self):
+
+        return self.get_inherited('MediaBox')
+
+    @property
+    def crop_box(self):
+
+        return self.get_inherited('CropBox', self.media_box)
+
+    @property
+    def rotate(self):
+
+        return self.get_inherited('Rotate', 0)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+# standard library import
+import logging as logger
+
+# third party related import
+
+# local library import
+from pdfproto.page.PDFPage import PDFPage
+from pdfproto.parser.PDFObjectProxy import PDFObjectProxy
+
+
+class PDFPageTreeError(Exception): pass
+
+
+class PDFPageTree(object):
+    """The pages of a document as a lazy sequence (7.7.3).
+
+    Nothing is parsed until a page is read. A page is found by its index
+    from the /Count of the page tree nodes, so whole subtrees before it
+    are skipped rather than walked.
+
+    Attributes:
+        parser: An instance of PDFParser.
+        root_ref: The (object_number, generation_number) of the root
+            page tree node.
+
+    """
+
+    def __init__(self, parser, root_ref):
+
+        self.parser = parser
+        self.root_ref = root_ref
+        self._count = None
+
+    def resolve(self, value):
+        """Get the value of an indirect reference, or any other value as
+        it is. A reference which cannot be resolved is None."""
+
+        if isinstance(value, PDFObjectProxy):
+            return value.value
+
+        if isinstance(value, tuple):
+            obj = self.parser.get_object(*value)
+            return obj.data if obj is not None else None
+
+        return value
+
+    def _get_node(self, ref):
+        """Get the dict of a page tree node or a page."""
+
+        node = self.resolve(ref)
+        if not isinstance(node, dict):
+            logger.warn('page tree node %s is not a dictionary', ref)
+            raise PDFPageTreeError('Should be a dictionary')
+
+        return node
+
+    def _get_count(self, node):
+        """The number of pages under a node, 1 for a page."""
+
+        if node.get('Type') == 'Page' or 'Kids' not in node:
+            return 1
+
+        count = self.resolve(node.get('Count'))
+        if isinstance(count, bool) or not isinstance(count, (int, long)):
+            logger.warn('page tree node has no valid /Count')
+            raise PDFPageTreeError('Should be an integer /Count')
+
+        return count
+
+    def _get_kids(self, node):
+
+        kids = self.resolve(node.get('Kids'))
+        if not isinstance(kids, list):
+            logger.warn('page tree node has no valid /Kids')
+            raise PDFPageTreeError('Should be an array /Kids')
+
+        return kids
+
+    def __len__(self):
+
+        if self._count is None:
+            self._count = self._get_count(self._get_node(self.root_ref))
+
+        return self._count
+
+    def __getitem__(self, ix):
+
+        num_pages = len(self)
+        if ix < 0:
+            ix += num_pages
+
+        if not 0 <= ix < num_pages:
+            raise IndexError('page index out of range')
+
+        ref, node = self.root_ref, self._get_node(self.root_ref)
+        ancestors = []
+        path = set()
+
+        # descend into the kid whose pages cover ix
+        while node.get('Type') != 'Page' and 'Kids' in node:
+            if ref in path:
+                logger.warn('page tree node %s is its own ancestor', ref)
+                raise PDFPageTreeError('page tree has a cycle')
+
+            path.add(ref)
+            ancestors.insert(0, node)
+
+            for kid_ref in self._get_kids(node):
+                kid = self._get_node(kid_ref)
+                count = self._get_count(kid)
+                if ix < count:
+                    ref, node = kid_ref, kid
+                    break
+
+                ix -= count
+            else:
+                logger.warn('/Count of page tree node %s is too large', ref)
+                raise PDFPageTreeError('page is not found')
+
+        return PDFPage(ref, node, ancestors, self.resolve)
+
+    def __iter__(self):
+
+        # stack of (kids, index of the next kid, ancestors)
+        root = self._get_node(self.root_ref)
+        if root.get('Type') == 'Page' or 'Kids' not in root:
+            yield PDFPage(self.root_ref, root, [], self.resolve)
+            return
+
+        stack = [(self._get_kids(root), 0, [root])]
+        visited = set()
+
+        while stack:
+            kids, ix, ancestors = stack.pop()
+            if ix >= len(kids):
+                continue
+
+            stack.append((kids, ix + 1, ancestors))
+
+            kid_ref = kids[ix]
+            if kid_ref in visited:
+                logger.warn('page tree node %s is visited again', kid_ref)
+                continue
+
+            visited.add(kid_ref)
+
+            kid = self._get_node(kid_ref)
+            if kid.get('Type') == 'Page' or 'Kids' not in kid:
+                yield PDFPage(kid_ref, kid, ancestors, self.resolve)
+            else:
+                stack.append((self._get_kids(kid), 0, [kid] + ancestors))
@@ -0,0 +1,161 @@
+# standard library import
+from contextlib import closing
+from tempfile import NamedTemporaryFile
+
+# third party related import
+import pytest
+
+# local library import
+from pdfproto.PDFDoc import PDFDoc
+from pdfproto.page.PDFPageTree import *
+from pdfproto.parser.test.pdf_builder import make_pdf
+
+
+class TestPDFPageTree:
+
+    def make_tree(self, num_pages, fanout):
+        """Objects of a balanced page tree, the page i has /Index i."""
+
+        objects = ['<</Type /Catalog /Pages 2 0 R>>', None]
+        nodes = []
+
+        def add(obj):
+            objects.append(obj)
+            return len(objects)
+
+        level = [add('<</Type /Page /Parent %%d 0 R /Index %d>>' % ix)
+                 for ix in xrange(num_pages)]
+        counts = [1] * num_pages
+
+        while len(level) > 1:
+            next_level, next_counts = [], []
+            for start in xrange(0, len(level), fanout):
+                kids = level[start:(start + fanout)]
+                count = sum(counts[start:(start + fanout)])
+                obj_num = add(None)
+                nodes.append((obj_num, kids, count))
+                next_level.append(obj_num)
+                next_counts.append(count)
+
+            level, counts = next_level, next_counts
+
+        # the top node is object 2
+        objects.pop()
+        nodes[-1] = (2, nodes[-1][1], nodes[-1][2])
+
+        for obj_num, kids, count in nodes:
+            objects[obj_num - 1] = (
+                    '<</Type /Pages /Kids [%s] /Count %d /Rotate 90 '
+                    '/MediaBox [0 0 %d 792]>>' %
+                    (' '.join('%d 0 R' % kid for kid in kids), count, obj_num))
+            for kid in kids:
+                if '%d' in objects[kid - 1]:
+                    objects[kid - 1] = objects[kid - 1] % obj_num
+
+        return objects
+
+    def test_pages(self):
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(make_pdf(self.make_tree(100, 4)))
+            f.flush()
+
+            doc = PDFDoc()
+            doc.open(f.name)
+
+            assert doc.page_count == 100
+            assert doc.pages[0].data['Index'] == 0
+            assert doc.pages[57].data['Index'] == 57
+
+            # only the path to the page and its siblings are parsed
+            num_parsed = doc.parser.cache_misses
+            last_page = doc.pages[-1]
+            assert last_page.data['Index'] == 99
+            assert doc.parser.cache_misses - num_parsed < 20
+
+            assert [page.data['Index'] for page in doc.pages] == range(100)
+
+            with pytest.raises(IndexError):
+                doc.pages[100]
+
+    def test_pages_empty_node(self):
+
+        # as many pages as kids, but the kid at an index is not the page
+        # at that index
+        objects = [
+                '<</Type /Catalog /Pages 2 0 R>>',
+                '<</Type /Pages /Kids [3 0 R 4 0 R 5 0 R] /Count 3>>',
+                '<</Type /Pages /Parent 2 0 R /Kids [] /Count 0>>',
+                '<</Type /Page /Parent 2 0 R>>',
+                '<</Type /Pages /Parent 2 0 R /Kids [6 0 R 7 0 R] /Count 2>>',
+                '<</Type /Page /Parent 5 0 R>>',
+                '<</Type /Page /Parent 5 0 R>>',
+        ]
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(make_pdf(objects))
+            f.flush()
+
+            doc = PDFDoc()
+            doc.open(f.name)
+
+            refs = [(4, 0), (6, 0), (7, 0)]
+            assert [page.ref for page in doc.pages] == refs
+            assert [doc.pages[ix].ref for ix in xrange(3)] == refs
+
+    def test_inherited(self):
+
+        objects = [
+                '<</Type /Catalog /Pages 2 0 R>>',
+                '<</Type /Pages /Kids [3 0 R 4 0 R] /Count 3 '
+                '/MediaBox [0 0 612 792] /Resources <</Font <<>>>>>>',
+                '<</Type /Page /Parent 2 0 R /Rotate 90>>',
+                '<</Type /Pages /Parent 2 0 R /Kids [5 0 R 7 0 R] /Count 2 '
+                '/Rotate 180 /CropBox 6 0 R>>',
+                '<</Type /Page /Parent 4 0 R /MediaBox [0 0 100 100]>>',
+                '[0 0 50 50]',
+                '<</Type /Page /Parent 4 0 R /Rotate 0>>',
+        ]
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(make_pdf(objects))
+            f.flush()
+
+            doc = PDFDoc()
+            doc.open(f.name)
+
+            pages = list(doc.pages)
+            assert [page.ref for page in pages] == [(3, 0), (5, 0), (7, 0)]
+
+            assert pages[0].rotate == 90
+            assert pages[0].media_box == [0, 0, 612, 792]
+            assert pages[0].crop_box == [0, 0, 612, 792]
+            assert pages[0].resources == {'Font': {}}
+
+            assert pages[1].rotate == 180
+            assert pages[1].media_box == [0, 0, 100, 100]
+            assert pages[1].crop_box == [0, 0, 50, 50]
+
+            assert pages[2].rotate == 0
+            assert doc.pages[2].ref == (7, 0)
+            assert doc.pages[2].ancestors[0]['Rotate'] == 180
+
+    def test_cycle(self):
+
+        objects = [
+                '<</Type /Catalog /Pages 2 0 R>>',
+                '<</Type /Pages /Kids [3 0 R] /Count 2>>',
+                '<</Type /Pages /Kids [2 0 R] /Count 2>>',
+        ]
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(make_pdf(objects))
+            f.flush()
+
+            doc = PDFDoc()
+            doc.open(f.name)
+
+            with pytest.raises(PDFPageTreeError):
+                doc.pages[1]
+
+            assert list(doc.pages) == []
@@ -1,14 +1,17 @@
 #!/usr/bin/env python
 
 # standard library import
+import binascii
 import logging as logger
 import os
 import re
+from collections import OrderedDict
 
 # third party related import
 
 # local library import
 from pdfproto.parser.pdf_objects import *
+from pdfproto.parser.PDFObjectProxy import PDFObjectProxy
 
 
 class PDFLexerError(Exception): pass
@@ -21,35 +24,104 @@ class PDFLexer:
     binary content.
 
     Attribute:
-        stream: A memory mapped file.
+        stream: A memory mapped file, or a string, eg. the decoded data
+            of an object stream.
+        resolver: A callable (object_num, generation_num) -> value used
+            to resolve indirect /Length of streams. It returns None if
+            the object cannot be resolved.
+        proxy_resolver: A callable (object_num, generation_num) -> PDF
+            object. If it is given, the data of indirect references are
+            instances of PDFObjectProxy which resolve through it,
+            instead of (object_num, generation_num) tuples.
+        memo_size: An integer of the maximum number of objects kept in
+            the memo. The objects returned by get_obj, get_dictionary,
+            get_indirect_object and get_stream are kept by their
+            starting position, and the least recently used one is
+            dropped when it is full. 0 disables the memo.
+        memo_hits: An integer of the number of objects returned from
+            the memo.
+        memo_misses: An integer of the number of objects not found in
+            the memo.
 
     """
 
     WHITE_SPACE_CHARCTERS = '\0\t\n\f\r '
 
-    DELIMITER_CHARACTERS = '()<>[]{}/%'
+    # white space and comments followed by the next recognizable
+    # character
+    RE_NEXT_TOKEN = re.compile(r'(?:[\0\t\n\f\r ]+|%[^\r\n]*(?![^\r\n]))*(.)?',
+                               re.S)
 
-    NUMERIC_CHARACTERS = '0123456789+-.'
+    RE_COMMENT = re.compile(r'%[^\r\n]*')
 
-    RE_WHITE_SPACE = re.compile(r'[\0\t\n\f\r ]')
+    RE_NUMERIC = re.compile(r'[0-9+\-.]+')
+
+    # regular characters, ie. neither white space nor delimiter
+    RE_REGULAR = re.compile(r'[^\0\t\n\f\r ()<>\[\]{}/%]*')
+
+    # skip white space and comments, then match a whole number (group
+    # 1), a whole name without the leading solidus (group 2) or any
+    # other recognizable character (group 3). A comment runs to the
+    # EOL, it does not backtrack to leave a token at the end.
+    RE_TOKEN = re.compile(r'(?:[\0\t\n\f\r ]+|%[^\r\n]*(?![^\r\n]))*'
+                          r'(?:([0-9+\-.]+)|/([^\0\t\n\f\r ()<>\[\]{}/%]*)|(.))',
+                          re.S)
+
+    # "object_num generation_num obj" or "object_num generation_num R"
+    RE_INDIRECT_PREFIX = re.compile(r'(\d+)[\0\t\n\f\r ]+(\d+)[\0\t\n\f\r ]+'
+                                    r'(obj|R)(?![^\0\t\n\f\r ()<>\[\]{}/%])')
 
     # 7.3.4.2
-    # Ab EOL marker appearing within a literal string without a
-    # preceding REVERSE SOLIDUS shall be treated as a byte value of
-    # (0Ah), irrespective of whether the EOL marker was a CARRIAGE
-    # RETURN (0Dh), a LINE FEED (0Ah), or both
-    RE_EOL_WO_PRECEDING_SOLIDUS = re.compile(r'((?<=[^\\])[\n\r]+|^[\n\r]+)')
+    # characters which end a run of ordinary bytes in a literal string
+    RE_LITERAL_SPECIAL = re.compile(r'[()\\\r\n]')
+
+    RE_EOL = re.compile(r'[\r\n]+')
 
-    RE_OCTAL_ESCAPE = re.compile(r'\\[0-7]{1,3}')
+    # characters which change the nesting of a literal string
+    RE_LITERAL_NESTING = re.compile(r'[()\\]')
+
+    # characters which may change the nesting of an array or a
+    # dictionary, or start a string or a comment inside of it
+    RE_CONTAINER_SPECIAL = re.compile(r'[()<>\[\]%]')
+
+    RE_OCTAL_DIGITS = re.compile(r'[0-7]{1,3}')
+
+    # 7.3.4.2 Table 3
+    LITERAL_ESCAPES = {
+        'n': '\n', 'r': '\r', 't': '\t', 'b': '\b', 'f': '\f',
+        '(': '(', ')': ')', '\\': '\\',
+    }
 
     RE_NUMBER_SIGN_ESCAPE = re.compile(r'#[0-9a-fA-F]{2}')
 
-    def __init__(self, stream):
+    # maximum number of distinct names kept in the name cache
+    NAME_CACHE_SIZE = 4096
+
+    # keys of a stream dictionary which are needed to lex and decode
+    # the stream
+    STREAM_KEYS = frozenset(['Length', 'Filter', 'DecodeParms'])
+
+    # optional EOL and keyword endstream after stream data
+    RE_ENDSTREAM = re.compile(r'[\0\t\n\f\r ]*endstream')
+
+    def __init__(self, stream, resolver=None, memo_size=0,
+                 proxy_resolver=None):
 
         self.stream = stream
-        self.max_pos = self.stream.size()
+        self.max_pos = len(self.stream)
+        self.resolver = resolver
+        self.proxy_resolver = proxy_resolver
+
+        # (kind, starting position) -> PDF object, in LRU order
+        self.memo_size = memo_size
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self._memo = OrderedDict()
+
+        # raw name -> interned decoded name
+        self._name_cache = {}
 
-    def get_obj(self, pos):
+    def get_obj(self, pos, keys=None):
         """Try to get a PDF object from the specified position.
 
         Start from the specified position at the file, read until a
@@ -58,6 +130,8 @@ class PDFLexer:
 
         Args:
             pos: An integer indicating where lexer starts to parse.
+            keys: If the object is a dictionary or a stream, only the
+                entries of these keys are built. See get_dictionary.
 
         Returns:
             If lexer cannot parse, None is returned. Otherwise, the
@@ -65,32 +139,103 @@ class PDFLexer:
 
         """
 
-        ch, stream_pos = self.get_next_token(pos)
+        if keys is None and self.memo_size > 0:
+            return self._memoize('obj', pos, self._get_obj)
+
+        return self._get_obj(pos, keys)
+
+    def _get_obj(self, pos, keys=None):
+        """Get a PDF object without looking up the memo."""
+
+        match_obj = self.RE_TOKEN.match(self.stream, pos)
+        if match_obj is None:
+            return None
+
+        return self._make_obj(match_obj, keys)
+
+    def _memoize(self, kind, pos, get_method):
+        """Look up the memo for the object, or get and keep it.
+
+        Args:
+            kind: A string telling apart the objects got by different
+                methods at the same position.
+            pos: An integer of the starting position.
+            get_method: A callable (pos) -> PDF object, used when the
+                object is not in the memo.
+
+        Returns:
+            A PDF object, or None as get_method returns.
+
+        """
+
+        key = (kind, pos)
+
+        ret = self._memo.pop(key, None)
+        if ret is not None:
+            self.memo_hits += 1
+            self._memo[key] = ret
+            return ret
+
+        self.memo_misses += 1
+
+        ret = get_method(pos)
+        if ret is not None:
+            self._memo[key] = ret
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+        return ret
+
+    def clear_memo(self):
+        """Drop all objects in the memo and reset its counters."""
+
+        self._memo.clear()
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    def _make_obj(self, match_obj, keys=None):
+        """Create a PDF object from a matched RE_TOKEN.
+
+        Returns:
+            A PDF object, or None if the token does not start one.
+
+        """
+
+        token_type = match_obj.lastindex
+        stream_pos = match_obj.start(token_type)
 
-        if ch in self.NUMERIC_CHARACTERS:
-            if ch.isdigit():
-                try:
-                    return self.get_indirect_object(stream_pos)
-                except PDFLexerError:
-                    try:
-                        return self.get_indirect_reference(stream_pos)
-                    except PDFLexerError:
-                        pass
+        if token_type == 1:
+            # look ahead once for "int int obj" or "int int R"
+            prefix = self.RE_INDIRECT_PREFIX.match(self.stream, stream_pos)
+            if prefix is not None:
+                if prefix.group(3) == 'R':
+                    return self._make_indirect_reference(prefix)
 
-            return self.get_number(stream_pos)
-        elif ch == '(':
+                return self._make_indirect_object(prefix)
+
+            return self._make_number(match_obj.group(1), stream_pos,
+                                     match_obj.end(1))
+        elif token_type == 2:
+            return self._make_name(match_obj.group(2), stream_pos - 1,
+                                   match_obj.end(2))
+
+        ch = match_obj.group(3)
+
+        if ch == '(':
             return self.get_literal_string(stream_pos)
-        elif ch == '/':
-            return self.get_name(stream_pos)
         elif ch == '[':
             return self.get_array(stream_pos)
         elif ch == '<':
-            next_char, next_char_pos = self.get_next_token(stream_pos + 1)
-            if next_char == '<' and next_char_pos == stream_pos + 1:
-                try:
-                    return self.get_stream(stream_pos)
-                except PDFLexerError, e:
-                    return self.get_dictionary(stream_pos)
+            if self.stream[(stream_pos + 1):(stream_pos + 2)] == '<':
+                # a dictionary, and a stream if keyword "stream" follows
+                if keys is not None:
+                    keys = self.STREAM_KEYS.union(keys)
+                stream_dict = self._get_dictionary(stream_pos, keys)
+                kw, kw_pos = self.get_next_token(stream_dict.end_pos)
+                if self.stream[kw_pos:(kw_pos + 6)] == 'stream':
+                    return self._make_stream(stream_dict, kw_pos)
+
+                return stream_dict
 
             return self.get_hexadecimal_string(stream_pos)
         elif ch == 't':
@@ -117,57 +262,204 @@ class PDFLexer:
 
         return None
 
-    def get_next_token(self, stream_pos):
-        """Get a recognizable character.
+    def skip_obj(self, pos):
+        """Find where the PDF object from the specified position ends.
 
-        Read from the specified position until a non-white-space
-        character is met. Skip comment and white space.
+        It works like get_obj, but no value is built. Strings, arrays
+        and dictionaries are stepped over by searching for the
+        delimiters only. /Length of a stream is still parsed, but the
+        stream data is not copied.
 
         Args:
-            stream_pos: An integer indicating the starting position.
+            pos: An integer indicating where lexer starts to scan.
 
         Returns:
-            A (token, position) tuple. If reach end of file, token will
-            be None.
+            An (end_pos, object_type) tuple, where object_type is one of
+            the PDFBaseObject subclasses. If lexer cannot recognize an
+            object, None is returned.
 
         """
 
-        ch, pos = None, stream_pos
+        stream = self.stream
 
-        while pos < self.max_pos:
-            ch = self.stream[pos]
+        match_obj = self.RE_TOKEN.match(stream, pos)
+        if match_obj is None:
+            return None
 
-            if ch == '%':
-                pos = self._skip_comment(pos)
-                continue
+        token_type = match_obj.lastindex
+        stream_pos = match_obj.start(token_type)
+
+        if token_type == 1:
+            prefix = self.RE_INDIRECT_PREFIX.match(stream, stream_pos)
+            if prefix is None:
+                return (match_obj.end(1), PDFNumericObject)
+            elif prefix.group(3) == 'R':
+                return (prefix.end(), PDFIndirectRefObject)
+
+            body = self.skip_obj(prefix.end())
+            if body is None:
+                logger.warn('Should be an object')
+                logger.debug('...%s...', stream[prefix.end():(prefix.end() + 10)])
+                raise PDFLexerError('Should be an object')
 
-            if self._is_white_space(ch):
+            ch, ch_pos = self.get_next_token(body[0])
+            if stream[ch_pos:(ch_pos + 6)] != 'endobj':
+                logger.warn('Should be keyword "endobj"')
+                logger.debug('...%s...', stream[ch_pos:(ch_pos + 10)])
+                raise PDFLexerError('Should be keyword "endobj"')
+
+            return (ch_pos + 6, PDFIndirectObject)
+        elif token_type == 2:
+            return (match_obj.end(2), PDFNameObject)
+
+        ch = match_obj.group(3)
+
+        if ch == '(':
+            return (self._skip_literal_string(stream_pos), PDFStringObject)
+        elif ch == '[':
+            return (self._skip_container(stream_pos), PDFArrayObject)
+        elif ch == '<':
+            if stream[(stream_pos + 1):(stream_pos + 2)] != '<':
+                end_pos = stream.find('>', stream_pos + 1)
+                if end_pos == -1:
+                    raise PDFLexerError('Unterminated hexadecimal string')
+
+                return (end_pos + 1, PDFStringObject)
+
+            end_pos = self._skip_container(stream_pos)
+            kw, kw_pos = self.get_next_token(end_pos)
+            if stream[kw_pos:(kw_pos + 6)] == 'stream':
+                stream_dict = self._get_dictionary(stream_pos,
+                                                   self.STREAM_KEYS)
+                return (self._make_stream(stream_dict, kw_pos).end_pos,
+                        PDFStreamObject)
+
+            return (end_pos, PDFDictObject)
+        elif ch == 't':
+            if stream[stream_pos:(stream_pos + 4)] == 'true':
+                return (stream_pos + 4, PDFBooleanObject)
+        elif ch == 'f':
+            if stream[stream_pos:(stream_pos + 5)] == 'false':
+                return (stream_pos + 5, PDFBooleanObject)
+        elif ch == 'n':
+            if stream[stream_pos:(stream_pos + 4)] == 'null':
+                return (stream_pos + 4, PDFNullObject)
+
+        return None
+
+    def _skip_literal_string(self, stream_pos):
+        """Get the end position of the literal string at stream_pos."""
+
+        search_nesting = self.RE_LITERAL_NESTING.search
+        num_parentheses = 0
+        pos = stream_pos
+
+        while True:
+            match_obj = search_nesting(self.stream, pos)
+            if match_obj is None:
+                logger.debug('...%s...', self.stream[stream_pos:(stream_pos + 10)])
+                raise PDFLexerError('Unterminated literal string')
+
+            ch = match_obj.group()
+            pos = match_obj.end()
+
+            if ch == '(':
+                num_parentheses += 1
+            elif ch == ')':
+                num_parentheses -= 1
+                if num_parentheses == 0:
+                    return pos
+            else:
+                # the escaped character never changes the nesting
                 pos += 1
+
+    def _skip_container(self, stream_pos):
+        """Get the end position of the array or dictionary at
+        stream_pos."""
+
+        stream = self.stream
+        search_special = self.RE_CONTAINER_SPECIAL.search
+
+        # opening delimiters which are not closed yet
+        enclosures = []
+        pos = stream_pos
+
+        while True:
+            match_obj = search_special(stream, pos)
+            if match_obj is None:
+                logger.debug('...%s...', stream[stream_pos:(stream_pos + 10)])
+                raise PDFLexerError('unbalanced array or dictionary enclose')
+
+            ch = match_obj.group()
+            ch_pos = match_obj.start()
+            pos = ch_pos + 1
+
+            if ch == '(':
+                pos = self._skip_literal_string(ch_pos)
                 continue
+            elif ch == '%':
+                pos = self.RE_COMMENT.match(stream, ch_pos).end()
+                continue
+            elif ch == '[':
+                enclosures.append(ch)
+                continue
+            elif ch == '<':
+                if stream[pos:(pos + 1)] == '<':
+                    enclosures.append(ch)
+                    pos += 1
+                else:
+                    pos = stream.find('>', pos) + 1
+                    if pos == 0:
+                        raise PDFLexerError('Unterminated hexadecimal string')
+                continue
+            elif ch == '>':
+                if stream[pos:(pos + 1)] != '>':
+                    logger.debug('...%s...', stream[stream_pos:pos])
+                    raise PDFLexerError('unbalanced dictionary enclose')
+                pos += 1
+                opening = '<'
+            elif ch == ']':
+                opening = '['
+            else:
+                logger.debug('...%s...', stream[stream_pos:pos])
+                raise PDFLexerError('unbalanced literal string enclose')
 
-            break
+            if not enclosures or enclosures.pop() != opening:
+                logger.debug('...%s...', stream[stream_pos:pos])
+                raise PDFLexerError('unbalanced array or dictionary enclose')
 
-        return (ch, pos)
+            if not enclosures:
+                return pos
 
-    def _is_white_space(self, ch):
-        """Test if it is a white-space character."""
+    def get_next_token(self, stream_pos):
+        """Get a recognizable character.
 
-        return ch in self.WHITE_SPACE_CHARCTERS
+        Read from the specified position until a non-white-space
+        character is met. Skip comment and white space.
 
-    def _skip_comment(self, stream_pos):
-        """Try to skip comment and get the position of next object."""
+        Args:
+            stream_pos: An integer indicating the starting position.
 
-        assert(self.stream[stream_pos] == '%')
+        Returns:
+            A (token, position) tuple. If reach end of file, token will
+            be None.
 
-        pos = stream_pos
+        """
 
-        while pos < self.max_pos:
-            if self.stream[pos] in ('\r', '\n'):
-                break
+        match_obj = self.RE_NEXT_TOKEN.match(self.stream, stream_pos)
+        ch = match_obj.group(1)
 
-            pos += 1
+        if ch is None:
+            return (None, match_obj.end())
 
-        return pos
+        return (ch, match_obj.end() - 1)
+
+    def _skip_comment(self, stream_pos):
+        """Try to skip comment and get the position of next object."""
+
+        assert(self.stream[stream_pos] == '%')
+
+        return self.RE_COMMENT.match(self.stream, stream_pos).end()
 
     def get_number(self, stream_pos):
         """Get an int or float number at stream_pos.
@@ -181,39 +473,30 @@ class PDFLexer:
 
         """
 
-        if self.stream[stream_pos] not in self.NUMERIC_CHARACTERS:
+        match_obj = self.RE_NUMERIC.match(self.stream, stream_pos)
+        if match_obj is None:
             logger.warn('Should start from a digit character')
             logger.debug('...%s...', self.stream[stream_pos:(stream_pos + 10)])
             raise PDFLexerError('Should start from a digit character')
 
-        ret = PDFNumericObject()
-        ret.start_pos = ret.end_pos = stream_pos
-
-        while ret.end_pos < self.max_pos:
-            if self.stream[ret.end_pos] not in self.NUMERIC_CHARACTERS:
-                break
+        return self._make_number(match_obj.group(), stream_pos,
+                                 match_obj.end())
 
-            ret.end_pos += 1
+    def _make_number(self, data, start_pos, end_pos):
+        """Create a PDFNumericObject from the matched numeric token."""
 
-        data = self.stream[ret.start_pos:ret.end_pos]
+        ret = PDFNumericObject()
+        ret.start_pos, ret.end_pos = start_pos, end_pos
 
         try:
             ret.data = float(data) if '.' in data else int(data)
         except ValueError, e:
             logger.warn('Invalid numeric object: %s', data)
-            logger.debug('...%s...', self.stream[stream_pos:(stream_pos + 10)])
+            logger.debug('...%s...', self.stream[start_pos:(start_pos + 10)])
             raise PDFLexerError(unicode(e))
 
         return ret
 
-    def _octal_replacer(self, match_obj):
-        """
-        It is used in re.sub and will replace octal code to character.
-
-        """
-
-        return chr(int(match_obj.group(0)[1:], 8))
-
     def _number_sign_replacer(self, match_obj):
         """
         It is used in re.sub and will replace number sign escape
@@ -240,63 +523,69 @@ class PDFLexer:
             logger.debug('...%s...', self.stream[stream_pos:(stream_pos + 10)])
             raise PDFLexerError('Should start from "(" character')
 
-        ret = PDFStringObject()
-        ret.start_pos, ret.end_pos = stream_pos, stream_pos + 1
-
-        num_parentheses = 1
+        stream = self.stream
+        search_special = self.RE_LITERAL_SPECIAL.search
         string_data = []
+        num_parentheses = 1
+        pos = stream_pos + 1
 
-        # retrieve a complete literal string based on balanced
-        # parentheses
-        while ret.end_pos < self.max_pos:
-            ch = self.stream[ret.end_pos]
+        # copy runs of ordinary bytes and decode the special ones in a
+        # single sweep, until the parentheses are balanced
+        while True:
+            match_obj = search_special(stream, pos)
+            if match_obj is None:
+                logger.error('Unterminated literal string')
+                logger.debug('result: %s', string_data)
+                raise PDFLexerError('Unterminated literal string')
+
+            special_pos = match_obj.start()
+            if special_pos > pos:
+                string_data.append(stream[pos:special_pos])
+
+            ch = match_obj.group()
+            pos = special_pos + 1
+
+            if ch == ')':
+                num_parentheses -= 1
+                if num_parentheses == 0:
+                    break
 
-            if ch == '(':
-                if  (len(string_data) == 0) or \
-                    (len(string_data) > 0 and string_data[-1] != '\\'):
-                    num_parentheses += 1
-            elif ch == ')':
-                # if two reverse solidus are before, then it won't be
-                # treated as escape
-                if len(string_data) > 0 and string_data[-1] == '\\':
-                    if len(string_data) > 1 and string_data[-2] == '\\':
-                        num_parentheses -= 1
+                string_data.append(ch)
+            elif ch == '(':
+                num_parentheses += 1
+                string_data.append(ch)
+            elif ch == '\\':
+                escaped = stream[pos:(pos + 1)]
+
+                if escaped in self.LITERAL_ESCAPES:
+                    string_data.append(self.LITERAL_ESCAPES[escaped])
+                    pos += 1
+                elif escaped == '\r' or escaped == '\n':
+                    # disregard the REVERSE SOLIDUS and the EOL marker
+                    # following it
+                    pos += 1
+                    if escaped == '\r' and stream[pos:(pos + 1)] == '\n':
+                        pos += 1
                 else:
-                    num_parentheses -= 1
-
-            if num_parentheses == 0:
-                break
-
-            string_data.append(ch)
-            ret.end_pos += 1
-
-        if self.stream[ret.end_pos] != ')':
-            logger.error('Unterminated literal string')
-            logger.debug('result: %s', string_data)
-            raise PDFLexerError('Unterminated literal string')
-
-        ret.end_pos += 1
-        literal_str = ''.join(string_data)
-
-        # An EOL marker appearing within a literal string without a
-        # preceding REVERSE SOLIDUS shall be treated as a byte value of
-        # (0Ah), irrespective of whether the EOL marker was a CARRIAGE
-        # RETURN (0Dh), a LINE FEED (0Ah), or both
-        literal_str = self.RE_EOL_WO_PRECEDING_SOLIDUS.sub('\n', literal_str)
-
-        # deal with escape strings
-        escape_table = (
-            # disregard the REVERSE SOLIDUS and the EOL marker following it
-            ('\\\n', ''), ('\\\r', ''), ('\\\r\n', ''),
-            # 7.3.4.2 Table 3
-            ('\\n', '\n'), ('\\r', '\r'), ('\\t', '\t'), ('\\b', '\b'),
-            ('\\f', '\f'), ('\\(', '('), ('\\)', ')'), ('\\\\', '\\')
-        )
-        for replacee, replacer in escape_table:
-            literal_str = literal_str.replace(replacee, replacer)
-
-        # deal with octal codes
-        ret.data = self.RE_OCTAL_ESCAPE.sub(self._octal_replacer, literal_str)
+                    octal = self.RE_OCTAL_DIGITS.match(stream, pos)
+                    if octal is not None:
+                        # high-order overflow shall be ignored
+                        string_data.append(chr(int(octal.group(), 8) & 0xff))
+                        pos = octal.end()
+
+                    # otherwise the REVERSE SOLIDUS shall be ignored
+            else:
+                # An EOL marker appearing within a literal string
+                # without a preceding REVERSE SOLIDUS shall be treated
+                # as a byte value of (0Ah), irrespective of whether the
+                # EOL marker was a CARRIAGE RETURN (0Dh), a LINE FEED
+                # (0Ah), or both
+                string_data.append('\n')
+                pos = self.RE_EOL.match(stream, special_pos).end()
+
+        ret = PDFStringObject()
+        ret.start_pos, ret.end_pos = stream_pos, pos
+        ret.data = ''.join(string_data)
 
         return ret
 
@@ -317,35 +606,31 @@ class PDFLexer:
             logger.debug('...%s...', self.stream[stream_pos:(stream_pos + 10)])
             raise PDFLexerError('Should start from "<" character')
 
-        ret = PDFStringObject()
-        ret.start_pos, ret.end_pos = stream_pos, stream_pos + 1
-        ret.data = []
-
-        # retrieve a complete hexadecimal string
-        while ret.end_pos < self.max_pos and self.stream[ret.end_pos] != '>':
-            ret.end_pos += 1
-
-        if self.stream[ret.end_pos] != '>':
+        end_pos = self.stream.find('>', stream_pos + 1)
+        if end_pos == -1:
             logger.warn('Unterminated hexadecimal string')
-            logger.debug('result: %s', self.stream[stream_pos:ret.end_pos + 1])
+            logger.debug('result: %s', self.stream[stream_pos:(stream_pos + 10)])
             raise PDFLexerError('Unterminated hexadecimal string')
 
-        hex_str = self.stream[(ret.start_pos + 1):ret.end_pos]
-
         # 7.3.4.3
         # White-space characters shall be ignored
-        hex_str = self.RE_WHITE_SPACE.sub('', hex_str)
+        hex_str = self.stream[(stream_pos + 1):end_pos].translate(
+                None, self.WHITE_SPACE_CHARCTERS)
 
         # If there is an odd number of digits, the final digit shall be
         # assumed to be 0
         if len(hex_str) % 2 == 1:
             hex_str = ''.join((hex_str, '0'))
 
-        for i in xrange(0, len(hex_str), 2):
-            ret.data.append(chr(int(hex_str[i:(i + 2)], 16)))
+        ret = PDFStringObject()
+        ret.start_pos, ret.end_pos = stream_pos, end_pos + 1
 
-        ret.end_pos += 1
-        ret.data = ''.join(ret.data)
+        try:
+            ret.data = binascii.unhexlify(hex_str)
+        except TypeError, e:
+            logger.warn('Invalid hexadecimal string')
+            logger.debug('result: %s', self.stream[stream_pos:(end_pos + 1)])
+            raise PDFLexerError('Invalid hexadecimal string')
 
         return ret
 
@@ -366,22 +651,31 @@ class PDFLexer:
             logger.debug('...%s...', self.stream[stream_pos:(stream_pos + 10)])
             raise PDFLexerError('Should start from "/" character')
 
-        ret = PDFNameObject()
-        ret.start_pos, ret.end_pos = stream_pos, stream_pos + 1
-
         # retrieve a complete name
-        while ret.end_pos < self.max_pos:
-            if  self.stream[ret.end_pos] in self.WHITE_SPACE_CHARCTERS or \
-                self.stream[ret.end_pos] in self.DELIMITER_CHARACTERS:
-                break
+        match_obj = self.RE_REGULAR.match(self.stream, stream_pos + 1)
 
-            ret.end_pos += 1
+        return self._make_name(match_obj.group(), stream_pos, match_obj.end())
 
-        name = self.stream[(ret.start_pos + 1):ret.end_pos]
+    def _make_name(self, name, start_pos, end_pos):
+        """Create a PDFNameObject from the matched name token."""
 
-        # 7.3.5
-        ret.data = self.RE_NUMBER_SIGN_ESCAPE.sub(self._number_sign_replacer,
-                                                  name)
+        ret = PDFNameObject()
+        ret.start_pos, ret.end_pos = start_pos, end_pos
+
+        data = self._name_cache.get(name)
+        if data is None:
+            # 7.3.5
+            if '#' in name:
+                data = self.RE_NUMBER_SIGN_ESCAPE.sub(
+                        self._number_sign_replacer, name)
+            else:
+                data = name
+
+            data = intern(data)
+            if len(self._name_cache) < self.NAME_CACHE_SIZE:
+                self._name_cache[name] = data
+
+        ret.data = data
 
         return ret
 
@@ -402,76 +696,101 @@ class PDFLexer:
             logger.debug('...%s...', self.stream[stream_pos:(stream_pos + 10)])
             raise PDFLexerError('Should start from a digit character')
 
-        try:
-            object_num = self.get_number(stream_pos)
-            if not isinstance(object_num.data, int):
-                raise PDFLexerError()
-        except PDFLexerError, e:
-            raise PDFLexerError('Invalid indirect reference(object number)')
+        prefix = self.RE_INDIRECT_PREFIX.match(self.stream, stream_pos)
+        if prefix is None or prefix.group(3) != 'R':
+            raise PDFLexerError('Invalid indirect reference')
 
-        try:
-            generation_num = self.get_number(object_num.end_pos + 1)
-            if not isinstance(generation_num.data, int):
-                raise PDFLexerError()
-        except PDFLexerError, e:
-            raise PDFLexerError('Invalid indirect reference(generation number')
+        return self._make_indirect_reference(prefix)
 
-        if self.stream[min(self.max_pos, generation_num.end_pos + 1)] != 'R':
-            raise PDFLexerError('Invalid indirect reference')
+    def _make_indirect_reference(self, prefix):
+        """Create a PDFIndirectRefObject from a matched RE_INDIRECT_PREFIX."""
 
         ret = PDFIndirectRefObject()
-        ret.start_pos = stream_pos
-        ret.end_pos = generation_num.end_pos + 1 + 1
-        ret.data = (object_num.data, generation_num.data)
+        ret.start_pos, ret.end_pos = prefix.start(), prefix.end()
+
+        if self.proxy_resolver is None:
+            ret.data = (int(prefix.group(1)), int(prefix.group(2)))
+        else:
+            ret.data = PDFObjectProxy(int(prefix.group(1)),
+                                      int(prefix.group(2)),
+                                      self.proxy_resolver)
 
         return ret
 
-    def get_dictionary(self, stream_pos):
+    def get_dictionary(self, stream_pos, keys=None):
         """Get a dictionary object at stream_pos.
 
         Args:
             stream_pos: An integer specified the starting position at
                 the stream.
+            keys: A collection of names (without the leading solidus).
+                If it is given, only the entries of these keys are
+                built, and the values of the others are stepped over
+                with skip_obj.
 
         Returns:
             A PDFDictObject.
 
         """
 
+        if keys is None and self.memo_size > 0:
+            return self._memoize('dict', stream_pos, self._get_dictionary)
+
+        return self._get_dictionary(stream_pos, keys)
+
+    def _get_dictionary(self, stream_pos, keys=None):
+        """Get a dictionary object without looking up the memo."""
+
         if self.stream[stream_pos:stream_pos + 2] != '<<':
             logger.warn('Should start from "<<" character')
             logger.debug('...%s...', self.stream[stream_pos:(stream_pos + 10)])
             raise PDFLexerError('Should start from "<<" character')
 
+        if keys is None:
+            return self._get_container(stream_pos)
+
         ret = PDFDictObject()
         ret.start_pos = stream_pos
-        ret.end_pos = stream_pos + 2
+        pos = stream_pos + 2
 
         while True:
-            # parse dictionary key
-            ch, ch_pos = self.get_next_token(ret.end_pos)
-
-            if ch == '>':
-                if self.stream[ch_pos + 1] != '>':
+            match_obj = self.RE_TOKEN.match(self.stream, pos)
+
+            if match_obj is None:
+                logger.debug('...%s...', self.stream[stream_pos:pos])
+                raise PDFLexerError('unbalanced dictionary enclose')
+            elif match_obj.lastindex == 2:
+                key = self._make_name(match_obj.group(2),
+                                      match_obj.start(2) - 1,
+                                      match_obj.end(2))
+            elif match_obj.group(3) == '>':
+                ch_pos = match_obj.start(3)
+                if self.stream[(ch_pos + 1):(ch_pos + 2)] != '>':
                     logger.debug('...%s...',
                                  self.stream[stream_pos:(ch_pos + 1)])
                     raise PDFLexerError('unbalanced dictionary enclose')
                 ret.end_pos = ch_pos + 2
-                break
-            elif ch == '/':
-                key = self.get_name(ch_pos)
-                ret.end_pos = key.end_pos
+                return ret
             else:
-                logger.debug('...%s...',
-                             self.stream[stream_pos:(ch_pos + 1)])
+                ch_pos = match_obj.start(match_obj.lastindex)
+                logger.debug('...%s...', self.stream[stream_pos:(ch_pos + 1)])
                 raise PDFLexerError('parse dictionary error')
 
-            # parse dictionary value
-            value = self.get_obj(ret.end_pos)
-            ret.add_entry(key, value)
-            ret.end_pos = value.end_pos
+            # parse or step over dictionary value
+            if key.data in keys:
+                value = self._get_obj(key.end_pos)
+                if value is not None:
+                    ret.add_entry(key, value)
+                    pos = value.end_pos
+                    continue
+            else:
+                extent = self.skip_obj(key.end_pos)
+                if extent is not None:
+                    pos = extent[0]
+                    continue
 
-        return ret
+            logger.debug('...%s...', self.stream[stream_pos:key.end_pos])
+            raise PDFLexerError('parse dictionary error')
 
     def get_array(self, stream_pos):
         """Get an array object at stream_pos.
@@ -490,71 +809,175 @@ class PDFLexer:
             logger.debug('...%s...', self.stream[stream_pos:(stream_pos + 10)])
             raise PDFLexerError('Should start from "[" character')
 
-        ret = PDFArrayObject()
-        ret.start_pos, ret.end_pos = stream_pos, stream_pos + 1
+        return self._get_container(stream_pos)
+
+    def _get_container(self, stream_pos):
+        """Get a dictionary or an array starting at stream_pos.
+
+        Nested dictionaries and arrays are parsed with an explicit
+        stack instead of recursion, so the depth of nesting does not
+        grow the Python stack.
+
+        Args:
+            stream_pos: An integer indicating the position of "<<" or
+                "[".
+
+        Returns:
+            A PDFDictObject or a PDFArrayObject.
+
+        """
+
+        stream = self.stream
+        match_token = self.RE_TOKEN.match
+
+        # each item is (container, is_dict, key of the container in its
+        # parent dictionary)
+        stack = []
+        key = None
+
+        is_dict = stream[stream_pos] != '['
+        if is_dict:
+            ret = PDFDictObject()
+            pos = stream_pos + 2
+        else:
+            ret = PDFArrayObject()
+            pos = stream_pos + 1
+        ret.start_pos = stream_pos
 
         while True:
-            value = self.get_obj(ret.end_pos)
-            if value is None:
-                ch, ch_pos = self.get_next_token(ret.end_pos)
-                if ch == ']':
-                    ret.end_pos = ch_pos + 1
-                    break
+            match_obj = match_token(stream, pos)
 
-                logger.debug('...%s...',
-                             self.stream[stream_pos:ret.end_pos + 1])
+            if match_obj is None:
+                logger.debug('...%s...', stream[ret.start_pos:pos])
+                if is_dict:
+                    raise PDFLexerError('unbalanced dictionary enclose')
                 raise PDFLexerError('parse array error')
 
-            ret.add_entry(value)
-            ret.end_pos = value.end_pos
+            token_type = match_obj.lastindex
+
+            if token_type == 2:
+                # a name, either a dictionary key or a value
+                value = self._make_name(match_obj.group(2),
+                                        match_obj.start(2) - 1,
+                                        match_obj.end(2))
+                pos = value.end_pos
+                if not is_dict:
+                    ret.add_entry(value)
+                elif key is None:
+                    key = value
+                else:
+                    ret.add_entry(key, value)
+                    key = None
+                continue
 
-        return ret
+            ch = match_obj.group(3)
+            ch_pos = match_obj.start(token_type)
+
+            if is_dict and key is None:
+                if ch != '>':
+                    logger.debug('...%s...',
+                                 stream[ret.start_pos:(ch_pos + 1)])
+                    raise PDFLexerError('parse dictionary error')
+                elif stream[(ch_pos + 1):(ch_pos + 2)] != '>':
+                    logger.debug('...%s...',
+                                 stream[ret.start_pos:(ch_pos + 1)])
+                    raise PDFLexerError('unbalanced dictionary enclose')
+
+                pos = ch_pos + 2
+            elif ch == ']' and not is_dict:
+                pos = ch_pos + 1
+            elif ch == '[':
+                stack.append((ret, is_dict, key))
+                ret, is_dict, key = PDFArrayObject(), False, None
+                ret.start_pos, pos = ch_pos, ch_pos + 1
+                continue
+            elif ch == '<' and stream[(ch_pos + 1):(ch_pos + 2)] == '<':
+                stack.append((ret, is_dict, key))
+                ret, is_dict, key = PDFDictObject(), True, None
+                ret.start_pos, pos = ch_pos, ch_pos + 2
+                continue
+            else:
+                # any other value which is not a container
+                value = self._make_obj(match_obj)
+                if value is None:
+                    logger.debug('...%s...',
+                                 stream[ret.start_pos:(ch_pos + 1)])
+                    if is_dict:
+                        raise PDFLexerError('parse dictionary error')
+                    raise PDFLexerError('parse array error')
+
+                pos = value.end_pos
+                if is_dict:
+                    ret.add_entry(key, value)
+                    key = None
+                else:
+                    ret.add_entry(value)
+                continue
+
+            # the container is closed, add it to its parent
+            value = ret
+            value.end_pos = pos
 
-    def get_indirect_object(self, stream_pos):
+            if not stack:
+                return value
+
+            ret, is_dict, key = stack.pop()
+            if is_dict:
+                ret.add_entry(key, value)
+                key = None
+            else:
+                ret.add_entry(value)
+
+    def get_indirect_object(self, stream_pos, keys=None):
         """Get an indirect object.
 
         Args:
             stream_pos: An integer specified the starting position at
                 the stream.
+            keys: If the object is a dictionary or a stream, only the
+                entries of these keys are built. See get_dictionary.
 
         Returns:
             A PDFIndirectObject.
 
         """
 
+        if keys is None and self.memo_size > 0:
+            return self._memoize('indirect', stream_pos,
+                                 self._get_indirect_object)
+
+        return self._get_indirect_object(stream_pos, keys)
+
+    def _get_indirect_object(self, stream_pos, keys=None):
+        """Get an indirect object without looking up the memo."""
+
         if not self.stream[stream_pos].isdigit():
             logger.warn('Should start from a digit character')
             logger.debug('...%s...', self.stream[stream_pos:(stream_pos + 10)])
             raise PDFLexerError('Should start from a digit character')
 
-        ret = PDFIndirectObject()
-        ret.start_pos = stream_pos
-
-        try:
-            object_num = self.get_number(stream_pos)
-            if not isinstance(object_num.data, int):
-                raise PDFLexerError()
+        prefix = self.RE_INDIRECT_PREFIX.match(self.stream, stream_pos)
+        if prefix is None or prefix.group(3) != 'obj':
+            logger.warn('Should be keyword "obj"')
+            logger.debug('...%s...', self.stream[stream_pos:(stream_pos + 20)])
+            raise PDFLexerError('Should be keyword "obj"')
 
-            ret.object_num = object_num.data
-        except PDFLexerError, e:
-            raise PDFLexerError('Invalid stream object(object number)')
+        return self._make_indirect_object(prefix, keys)
 
-        try:
-            generation_num = self.get_number(object_num.end_pos + 1)
-            if not isinstance(generation_num.data, int):
-                raise PDFLexerError()
+    def _make_indirect_object(self, prefix, keys=None):
+        """Parse the body of an indirect object after a matched
+        RE_INDIRECT_PREFIX."""
 
-            ret.object_num = object_num.data
-        except PDFLexerError, e:
-            raise PDFLexerError('Invalid stream object(generation number')
-
-        kw_pos = generation_num.end_pos + 1
-        if self.stream[kw_pos:(kw_pos + 3)] != 'obj':
-            logger.warn('Should be keyword "obj"')
-            logger.debug('...%s...', self.stream[kw_pos:(kw_pos + 10)])
-            raise PDFLexerError('Should be keyword "obj"')
+        ret = PDFIndirectObject()
+        ret.start_pos = prefix.start()
+        ret.object_num = int(prefix.group(1))
+        ret.generation_num = int(prefix.group(2))
 
-        ret.data = self.get_obj(kw_pos + 3)
+        ret.data = self._get_obj(prefix.end(), keys)
+        if ret.data is None:
+            logger.warn('Should be an object')
+            logger.debug('...%s...', self.stream[prefix.end():(prefix.end() + 10)])
+            raise PDFLexerError('Should be an object')
 
         ch, ch_pos = self.get_next_token(ret.data.end_pos)
         if self.stream[ch_pos:(ch_pos + 6)] != 'endobj':
@@ -578,8 +1001,16 @@ class PDFLexer:
 
         """
 
+        if self.memo_size > 0:
+            return self._memoize('stream', stream_pos, self._get_stream)
+
+        return self._get_stream(stream_pos)
+
+    def _get_stream(self, stream_pos):
+        """Get a stream object without looking up the memo."""
+
         try:
-            stream_dict = self.get_dictionary(stream_pos)
+            stream_dict = self._get_dictionary(stream_pos)
         except PDFLexerError, e:
             logger.warn('Should be a dictionary')
             logger.debug('...%s...', self.stream[stream_pos:(stream_pos + 10)])
@@ -592,8 +1023,13 @@ class PDFLexer:
             logger.debug('...%s...', self.stream[kw_pos:(kw_pos + 10)])
             raise PDFLexerError('Should start from "stream"')
 
+        return self._make_stream(stream_dict, kw_pos)
+
+    def _make_stream(self, stream_dict, kw_pos):
+        """Create a PDFStreamObject whose keyword "stream" is at kw_pos."""
+
         ret = PDFStreamObject()
-        ret.start_pos = stream_pos
+        ret.start_pos = stream_dict.start_pos
         ret.stream_dict = stream_dict
 
         eol = self.stream[min(kw_pos + 6, self.max_pos)]
@@ -606,6 +1042,23 @@ class PDFLexer:
             logger.debug('...%s...', self.stream[(kw_pos + 6):(kw_pos + 16)])
             raise PDFLexerError('Should be an EOL')
 
+        # trust /Length if keyword endstream is right behind the data
+        length = self._get_stream_length(stream_dict)
+        if length is not None:
+            match_obj = self.RE_ENDSTREAM.match(self.stream, data_pos + length)
+            if match_obj is not None:
+                logger.debug('stream at %s: extent from /Length %s',
+                             stream_dict.start_pos, length)
+                ret.end_pos = match_obj.end()
+                ret.set_source(self.stream, data_pos, length)
+                return ret
+
+            logger.warn('stream at %s: /Length %s does not match endstream',
+                        stream_dict.start_pos, length)
+
+        logger.debug('stream at %s: extent from keyword endstream',
+                     stream_dict.start_pos)
+
         end_pos = self.stream.find('endstream', data_pos)
         if end_pos == -1:
             raise PDFLexerError('unterminated stream')
@@ -613,8 +1066,33 @@ class PDFLexer:
         ret.end_pos = end_pos + 9
 
         if self.stream[(end_pos - 2):end_pos] == '\r\n':
-            ret.data = ret.raw_data = self.stream[data_pos:(end_pos - 2)]
+            ret.set_source(self.stream, data_pos, end_pos - 2 - data_pos)
         else:
-            ret.data = ret.raw_data = self.stream[data_pos:(end_pos - 1)]
+            ret.set_source(self.stream, data_pos, end_pos - 1 - data_pos)
 
         return ret
+
+    def _get_stream_length(self, stream_dict):
+        """Get /Length of a stream dictionary.
+
+        Args:
+            stream_dict: An instance of PDFDictObject.
+
+        Returns:
+            A non-negative integer, or None if /Length is missing,
+            invalid or an indirect reference that cannot be resolved.
+
+        """
+
+        length = stream_dict.data.get('Length')
+
+        if isinstance(length, PDFObjectProxy):
+            length = (length.object_num, length.generation_num)
+
+        if isinstance(length, tuple) and self.resolver is not None:
+            length = self.resolver(*length)
+
+        if isinstance(length, bool) or not isinstance(length, (int, long)):
+            return None
+
+        return length if length >= 0 else None
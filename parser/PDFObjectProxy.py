@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+# standard library import
+
+# third party related import
+
+# local library import
+
+
+class PDFObjectProxy(object):
+    """A lazily resolved indirect reference.
+
+    The referenced object is resolved the first time its value is used,
+    through item access, iteration, len() or an attribute of the value,
+    eg. proxy['Kids'] or proxy.get('Count'), and then kept. The values
+    of a resolved dictionary or array hold proxies again, so cycles like
+    /Parent and /Kids are only followed as far as they are read.
+
+    A proxy compares equal to the (object_number, generation_number)
+    tuple of plain references, and is always true like it.
+
+    Attributes:
+        object_num: An integer of the object number.
+        generation_num: An integer of the generation number.
+        value: The data of the referenced object, or None if it cannot
+            be resolved.
+        resolved: True if the object is resolved.
+
+    """
+
+    __slots__ = ('object_num', 'generation_num', '_resolver', '_value',
+                 'resolved')
+
+    def __init__(self, object_num, generation_num, resolver):
+        """
+        Args:
+            object_num: An integer of the object number.
+            generation_num: An integer of the generation number.
+            resolver: A callable (object_num, generation_num) -> PDF
+                object or None, eg. PDFParser.get_object.
+
+        """
+
+        self.object_num = object_num
+        self.generation_num = generation_num
+        self._resolver = resolver
+        self._value = None
+        self.resolved = False
+
+    @property
+    def value(self):
+
+        if not self.resolved:
+            obj = self._resolver(self.object_num, self.generation_num)
+            self._value = obj.data if obj is not None else None
+            self.resolved = True
+
+            # the resolver is not needed anymore
+            self._resolver = None
+
+        return self._value
+
+    def __getattr__(self, name):
+
+        return getattr(self.value, name)
+
+    def __getitem__(self, key):
+
+        return self.value[key]
+
+    def __contains__(self, key):
+
+        return key in self.value
+
+    def __iter__(self):
+
+        return iter(self.value)
+
+    def __len__(self):
+
+        return len(self.value)
+
+    def __nonzero__(self):
+
+        # true as the reference tuple, rather than by __len__
+        return True
+
+    def __eq__(self, other):
+
+        if isinstance(other, PDFObjectProxy):
+            other = (other.object_num, other.generation_num)
+
+        return (self.object_num, self.generation_num) == other
+
+    def __ne__(self, other):
+
+        return not self == other
+
+    def __hash__(self):
+
+        return hash((self.object_num, self.generation_num))
+
+    def __repr__(self):
+
+        return 'PDFObjectProxy(%d, %d)' % (self.object_num,
+                                           self.generation_num)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+# standard library import
+from array import array
+import logging as logger
+import re
+
+# third party related import
+
+# local library import
+from pdfproto.parser.PDFLexer import PDFLexer, PDFLexerError
+
+
+class PDFObjectStreamError(Exception): pass
+
+
+class PDFObjectStream:
+    """Objects stored in an object stream (7.5.7).
+
+    The stream is decoded once, and the header of N pairs of integers
+    is parsed into an offset table, so any contained object is lexed
+    straight from its offset.
+
+    Attributes:
+        data: A string of the decoded stream.
+        object_nums: An array of the numbers of the contained objects.
+        offsets: An array of the positions of the contained objects in
+            data.
+        lexer: An instance of PDFLexer over data.
+
+    """
+
+    RE_INTEGER = re.compile(r'[\0\t\n\f\r ]*(\d+)')
+
+    def __init__(self, stream_obj, proxy_resolver=None):
+        """
+        Args:
+            stream_obj: An instance of PDFStreamObject whose /Type is
+                /ObjStm.
+            proxy_resolver: The proxy_resolver of the lexer, see
+                PDFLexer.
+
+        """
+
+        stream_dict = stream_obj.stream_dict.data
+        if stream_dict.get('Type') != 'ObjStm':
+            logger.warn('Should be /Type /ObjStm')
+            raise PDFObjectStreamError('Should be /Type /ObjStm')
+
+        num_objects = stream_dict.get('N')
+        first = stream_dict.get('First')
+        if (not isinstance(num_objects, (int, long)) or
+                not isinstance(first, (int, long)) or
+                num_objects < 0 or first < 0):
+            logger.warn('/N and /First should be non-negative integers')
+            raise PDFObjectStreamError('Invalid /N or /First')
+
+        # the filters raise errors of their own, eg. zlib.error
+        try:
+            self.data = stream_obj.get_decoded_data()
+        except Exception, e:
+            logger.warn('object stream cannot be decoded: %r', e)
+            raise PDFObjectStreamError('Should be a decodable stream')
+        self.object_nums = array('l')
+        self.offsets = array('l')
+        self._load_header(num_objects, first)
+
+        self.lexer = PDFLexer(self.data, proxy_resolver=proxy_resolver)
+
+    def __len__(self):
+
+        return len(self.object_nums)
+
+    def _load_header(self, num_objects, first):
+        """Parse the pairs of object numbers and offsets."""
+
+        pos = 0
+
+        for _ in xrange(2 * num_objects):
+            match_obj = self.RE_INTEGER.match(self.data, pos, first)
+            if match_obj is None:
+                logger.warn('Should be %d pairs of integers', num_objects)
+                raise PDFObjectStreamError('Invalid object stream header')
+
+            if len(self.object_nums) == len(self.offsets):
+                self.object_nums.append(int(match_obj.group(1)))
+            else:
+                self.offsets.append(first + int(match_obj.group(1)))
+
+            pos = match_obj.end()
+
+    def get_object(self, ix):
+        """Get a contained object.
+
+        Args:
+            ix: An integer of the index of the object in the stream.
+
+        Returns:
+            A tuple (object number, PDF object).
+
+        """
+
+        if not 0 <= ix < len(self.offsets):
+            logger.warn('object stream has no object %d', ix)
+            raise PDFObjectStreamError('index out of range')
+
+        try:
+            obj = self.lexer.get_obj(self.offsets[ix])
+        except (PDFLexerError, IndexError), e:
+            obj = None
+
+        if obj is None:
+            logger.warn('object %d of object stream cannot be parsed', ix)
+            raise PDFObjectStreamError('Should be an object')
+
+        return self.object_nums[ix], obj
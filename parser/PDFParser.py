@@ -1,18 +1,28 @@
 #!/usr/bin/env python
 
 # standard library import
-from collections import deque
+from collections import deque, OrderedDict
 from contextlib import closing
 import logging as logger
 import mmap
 import os
+import re
+import weakref
 
 # third party related import
 
 # local library import
-from PDFLexer import PDFLexer
-from pdfproto.xref.PDFCrossRefSection import PDFCrossRefSection
-from pdfproto.xref.PDFCrossRefStream import PDFCrossRefStream
+from PDFLexer import PDFLexer, PDFLexerError
+from PDFObjectStream import PDFObjectStream, PDFObjectStreamError
+from pdf_objects import PDFStreamObject
+from pdfproto.xref.PDFCrossRefEntry import PDFCrossRefEntry
+from pdfproto.xref.PDFCrossRefRecovery import PDFCrossRefRecovery
+from pdfproto.xref.PDFCrossRefSection import (PDFCrossRefSection,
+                                              PDFCrossRefSectionError)
+from pdfproto.xref.PDFCrossRefStream import (PDFCrossRefStream,
+                                             PDFCrossRefStreamError)
+from pdfproto.xref.PDFCrossRefTable import (PDFCrossRefTable,
+                                            PDFCrossRefTableError)
 
 
 class PDFParserError(Exception): pass
@@ -25,14 +35,86 @@ class PDFParser:
 
     Attribute:
         stream: A memory mapped file, ie. the document.
+        xref_table: An instance of PDFCrossRefTable used by get_object,
+            or None before it is loaded.
+        object_cache_size: An integer of the maximum number of objects
+            kept by get_object.
+        object_cache_bytes: An integer of the maximum number of bytes
+            of the objects kept by get_object, measured in the file.
+        cache_hits: An integer of the number of objects returned from
+            the object cache.
+        cache_misses: An integer of the number of objects parsed by
+            get_object.
+        cache_evictions: An integer of the number of objects dropped
+            from the object cache.
+        object_stream_cache_bytes: An integer of the maximum number of
+            bytes of decoded object streams kept by get_object_stream.
+        lazy_refs: If True, indirect references in the parsed objects
+            are instances of PDFObjectProxy which resolve through
+            get_object when they are used, rather than (object_num,
+            generation_num) tuples.
+        recover: If True, get_xref_table rebuilds the cross reference
+            table by scanning the file when startxref or the cross
+            reference tables are broken.
 
     """
 
-    def __init__(self):
+    # number of bytes at the end of file searched for startxref first,
+    # doubled until startxref is found
+    TAIL_WINDOW_SIZE = 1024
+
+    # number of bytes split into lines at a time by next_lines
+    LINE_CHUNK_SIZE = 65536
+
+    # a line and its EOL
+    RE_LINE = re.compile(r'[^\r\n]*(?:\r\n|\r|\n)?')
+
+    # keyword startxref and the byte offset on the next line
+    RE_STARTXREF = re.compile(r'startxref[\0\t\n\f\r ]+(\d+)')
+
+    # default bounds of the object cache
+    OBJECT_CACHE_SIZE = 4096
+
+    OBJECT_CACHE_BYTES = 16 * 1024 * 1024
+
+    # default bound of the decoded object streams
+    OBJECT_STREAM_CACHE_BYTES = 16 * 1024 * 1024
+
+    # errors of broken cross reference tables
+    XREF_ERRORS = (PDFParserError, PDFLexerError, PDFCrossRefSectionError,
+                   PDFCrossRefStreamError, PDFCrossRefTableError)
+
+    def __init__(self, object_cache_size=OBJECT_CACHE_SIZE,
+                 object_cache_bytes=OBJECT_CACHE_BYTES,
+                 object_stream_cache_bytes=OBJECT_STREAM_CACHE_BYTES,
+                 lazy_refs=False, recover=False):
 
         self._file_obj = None
         self.stream = None
         self.lexer = None
+        self.xref_table = None
+        self.lazy_refs = lazy_refs
+        self.recover = recover
+
+        # the lexer does not resolve /Length through the cross reference
+        # table being loaded, nor through an object being parsed
+        self._loading_xref = False
+        self._loading_objects = set()
+
+        # object number -> (generation number, PDF object, size), in
+        # LRU order
+        self.object_cache_size = object_cache_size
+        self.object_cache_bytes = object_cache_bytes
+        self._object_cache = OrderedDict()
+        self._object_cache_used = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+
+        # object number -> PDFObjectStream, in LRU order
+        self.object_stream_cache_bytes = object_stream_cache_bytes
+        self._object_stream_cache = OrderedDict()
+        self._object_stream_cache_used = 0
 
     def __del__(self):
 
@@ -53,7 +135,21 @@ class PDFParser:
         self._file_obj = open(name)
         self.stream = mmap.mmap(self._file_obj.fileno(), 0,
                                 prot=mmap.PROT_READ)
-        self.lexer = PDFLexer(self.stream)
+        # the lexer and the proxies refer to the parser weakly, or the
+        # cycles would keep the parser, which has __del__, forever
+        parser = weakref.proxy(self)
+
+        def resolve_value(obj_num, gen_num):
+            return parser._resolve_value(obj_num, gen_num)
+
+        def get_object(obj_num, gen_num):
+            return parser.get_object(obj_num, gen_num)
+
+        self.lexer = PDFLexer(self.stream, resolve_value,
+                              proxy_resolver=(get_object if self.lazy_refs
+                                              else None))
+        self.xref_table = None
+        self.clear_object_cache()
 
     def get_header(self):
         """Get the header of the pdf file.
@@ -81,38 +177,12 @@ class PDFParser:
 
         return header
 
-    def _reverse_lines(self):
-        """Yields lines in reverse order."""
-
-        # go to the tail position
-        self.stream.seek(0, os.SEEK_END)
-        max_pos = self.stream.tell()
-        end_pos = max_pos + 1
-
-        while end_pos > 1:
-            # find EOL
-            carrage_ix = self.stream.rfind('\r', 0, end_pos)
-            linefeed_ix = self.stream.rfind('\n', 0, end_pos)
-            ix = max(carrage_ix, linefeed_ix)
-
-            if ix == -1:
-                yield self.stream[0:end_pos]
-                break
-
-            yield self.stream[min(ix + 1, max_pos):end_pos]
-
-            curr_byte = self.stream[ix]
-            if curr_byte == '\r':
-                end_pos = ix
-            else:
-                if self.stream[max(0, ix - 1)] == '\r':
-                    end_pos = ix - 1
-                else:
-                    end_pos = ix
-
     def next_lines(self, start_pos=0, ensure_pos=False, skip_comment=True):
         """Yields lines from start_pos
 
+        The stream is split in chunks of LINE_CHUNK_SIZE bytes, and the
+        position of the memory mapped file is not changed.
+
         Args:
             start_pos: An integer indicating where we start to split lines.
             ensure_pos: If true, return a tuple (line, starting_pos).
@@ -124,44 +194,62 @@ class PDFParser:
 
         """
 
-        self.stream.seek(start_pos, os.SEEK_SET)
-        prev_pos, curr_pos = start_pos, None
+        max_pos = self.stream.size()
+        chunk_size = self.LINE_CHUNK_SIZE
+        pos = start_pos
 
-        while True:
-            data = self.stream.readline()
-            curr_pos = self.stream.tell()
+        while pos < max_pos:
+            chunk_end = min(max_pos, pos + chunk_size)
+            lines = self.stream[pos:chunk_end].splitlines(True)
 
-            if data == '':
-                break
+            # the last line may go on in the next chunk, eg. CR LF may
+            # be split
+            if chunk_end < max_pos:
+                lines.pop()
+                if len(lines) == 0:
+                    chunk_size *= 2
+                    continue
 
-            # eliminate trailing \n, \r
-            data = data[:-1]
-            if len(data) > 0 and data[-1] == '\r':
-                data = data[:-1]
+            for line in lines:
+                line_pos = pos
+                pos += len(line)
 
-            # split by \r
-            ix, pos = 0, 0
-            while ix != -1:
-                ix = data.find('\r', pos)
-
-                line = data[pos:ix] if ix != -1 else data[pos:]
+                line = line.rstrip('\r\n')
 
                 if skip_comment:
                     comment_ix = line.find('%')
                     if comment_ix != -1:
-                        line = data[pos:comment_ix]
+                        line = line[:comment_ix]
 
-                yield (line, prev_pos + pos) if ensure_pos else line
+                yield (line, line_pos) if ensure_pos else line
 
-                pos = ix + 1
+    def get_line(self, pos, skip_comment=True):
+        """Get the single line at a position.
 
-            prev_pos = curr_pos
+        Unlike next_lines, only the bytes of the line are read.
 
-    def _strip_comment(self, data):
-        """Strips comments."""
+        Args:
+            pos: An integer indicating where the line starts.
+            skip_comment: If false, the comment will not be ignored.
 
-        ix = data.find('%')
-        return data if ix == -1 else data[:ix]
+        Returns:
+            A tuple (stripped EOL string, position of the next line), or
+            (None, pos) at the end of file.
+
+        """
+
+        if pos >= self.stream.size():
+            return None, pos
+
+        end_pos = self.RE_LINE.match(self.stream, pos).end()
+        line = self.stream[pos:end_pos].rstrip('\r\n')
+
+        if skip_comment:
+            comment_ix = line.find('%')
+            if comment_ix != -1:
+                line = line[:comment_ix]
+
+        return line, end_pos
 
     def get_xref_pos(self):
         """Get the position of the first cross reference table.
@@ -172,57 +260,108 @@ class PDFParser:
 
         """
 
-        ret = 0
-        prev_line = None
+        return self.find_startxref()[0]
 
-        for line in self._reverse_lines():
-            if line == '':
-                continue
-            elif line == 'startxref':
+    def find_startxref(self):
+        """Find the last startxref and the end-of-file markers.
+
+        Only a window at the end of file is searched, starting from
+        TAIL_WINDOW_SIZE bytes and doubled until keyword startxref is
+        found.
+
+        Returns:
+            A (xref_pos, eof_positions) tuple. xref_pos is the integer
+            following the last startxref, or 0 if it cannot be found.
+            eof_positions is a sorted list of the positions of %%EOF
+            found in the searched window, each one ends a revision of
+            the document.
+
+        """
+
+        max_pos = self.stream.size()
+        window_size = self.TAIL_WINDOW_SIZE
+
+        while True:
+            start_pos = max(0, max_pos - window_size)
+            kw_pos = self.stream.rfind('startxref', start_pos, max_pos)
+            if kw_pos != -1 or start_pos == 0:
                 break
 
-            prev_line = line
+            window_size *= 2
 
-        if prev_line is None:
+        eof_positions = []
+        pos = self.stream.find('%%EOF', start_pos, max_pos)
+        while pos != -1:
+            eof_positions.append(pos)
+            pos = self.stream.find('%%EOF', pos + 5, max_pos)
+
+        if kw_pos == -1:
             logger.error('Can not find startxref')
-            return ret
+            return (0, eof_positions)
 
-        prev_line = self._strip_comment(prev_line)
+        match_obj = self.RE_STARTXREF.match(self.stream, kw_pos)
+        if match_obj is None:
+            logger.error('startxref should be followed by an integer')
+            return (0, eof_positions)
 
-        if prev_line.isdigit():
-            ret = int(prev_line)
-            logger.debug('startxref = %s', ret)
+        ret = int(match_obj.group(1))
+        logger.debug('startxref = %s', ret)
 
-        return ret
+        return (ret, eof_positions)
 
-    def get_xref(self, xref_pos):
+    def get_xref(self, xref_pos, lazy=False):
         """Get the cross reference tables.
 
         Args:
             xref_pos: The position of the latest updated trailer of the
                 PDF.
+            lazy: If True, the entries of cross reference sections are
+                parsed when they are looked up.
 
         Returns:
             A list of instances of PDFCrossRefSection or
-            PDFCrossRefStream which sorted by increment update order.
+            PDFCrossRefStream, the newest first. The XRefStm stream of
+            a hybrid-reference section follows the section.
+
+        """
+
+        return list(self.iter_xref(xref_pos, lazy))
+
+    def iter_xref(self, xref_pos, lazy=False):
+        """Parse the cross reference tables one by one, see get_xref.
+
+        An older table along /Prev is not read until the newer ones are
+        taken from the iterator.
 
         """
 
         xref_queue = deque([xref_pos])
-        ret = []
+        visited = set()
 
         while len(xref_queue) > 0:
 
             start_xref_pos = xref_queue.popleft()
 
+            # a Prev chain pointing back would never end
+            if start_xref_pos in visited:
+                logger.warn('xref at %d is already parsed', start_xref_pos)
+                continue
+
+            visited.add(start_xref_pos)
+
             # fetch one single line
-            for line in self.next_lines(start_xref_pos):
-                break
+            line, _ = self.get_line(start_xref_pos)
+            if line is None:
+                logger.error('xref at %d is out of the file', start_xref_pos)
+                raise PDFParserError('xref is out of the file')
 
             # determine cross reference type
-            xref = PDFCrossRefSection() if line == 'xref' else PDFCrossRefStream()
-            xref.parse(self, xref_pos)
-            ret.append(xref)
+            if line == 'xref':
+                xref = PDFCrossRefSection()
+                xref.parse(self, start_xref_pos, lazy)
+            else:
+                xref = PDFCrossRefStream()
+                xref.parse(self, start_xref_pos)
 
             # ensure trailer is parsed as well
             if xref.trailer is None:
@@ -245,4 +384,288 @@ class PDFParser:
 
                 xref_queue.append(xref.trailer.prev)
 
-        return ret
+            yield xref
+
+    def get_xref_table(self, lazy=False):
+        """Get the merged cross reference table of the PDF.
+
+        Args:
+            lazy: If True, cross reference entries are parsed and merged
+                when they are looked up, and older cross reference
+                tables are read only if newer ones miss an object.
+
+        Returns:
+            An instance of PDFCrossRefTable.
+
+        """
+
+        xref_table = PDFCrossRefTable(lazy)
+
+        loading_xref, self._loading_xref = self._loading_xref, True
+        try:
+            xref_pos = self.get_xref_pos()
+            if xref_pos == 0:
+                raise PDFParserError('startxref is not found')
+
+            xref_table.merge_xrefs(self.iter_xref(xref_pos, lazy))
+        except self.XREF_ERRORS, e:
+            if not self.recover:
+                raise
+
+            logger.warn('cross reference table is broken (%s), scanning '
+                        'the file', e)
+            xref_table = self.recover_xref_table()
+        finally:
+            self._loading_xref = loading_xref
+
+        return xref_table
+
+    def recover_xref_table(self):
+        """Rebuild the cross reference table by scanning the file.
+
+        Returns:
+            An instance of PDFCrossRefTable, see PDFCrossRefRecovery.
+
+        """
+
+        recovery = PDFCrossRefRecovery()
+        recovery.parse(self)
+
+        xref_table = PDFCrossRefTable()
+        xref_table.merge_xrefs([recovery])
+
+        return xref_table
+
+    @property
+    def trailer(self):
+        """The newest trailer, an instance of PDFTrailer."""
+
+        self._load_xref_table()
+
+        return self.xref_table.trailer
+
+    def _load_xref_table(self):
+        """Load the cross reference table used by get_object, with lazy
+        xref subsections."""
+
+        if self.xref_table is None:
+            self.xref_table = self.get_xref_table(lazy=True)
+
+    def _lookup(self, obj_num, gen_num=None):
+        """Look up the cross reference table used by get_object, which
+        may read older xrefs of the lazy table. If one of them is broken
+        and recover is set, the table is rebuilt by scanning the file."""
+
+        self._load_xref_table()
+
+        loading_xref, self._loading_xref = self._loading_xref, True
+        try:
+            return self.xref_table.lookup(obj_num, gen_num)
+        except self.XREF_ERRORS, e:
+            if not self.recover:
+                raise
+
+            logger.warn('cross reference table is broken (%s), scanning '
+                        'the file', e)
+            self.xref_table = self.recover_xref_table()
+
+            return self.xref_table.lookup(obj_num, gen_num)
+        finally:
+            self._loading_xref = loading_xref
+
+    def get_object(self, obj_num, gen_num=None):
+        """Get an indirect object by its number.
+
+        The object is located by the cross reference table, and kept
+        in a LRU cache bounded by object_cache_size and
+        object_cache_bytes.
+
+        Args:
+            obj_num: An integer of the object number.
+            gen_num: An integer of the generation number, or None for
+                the current one.
+
+        Returns:
+            The PDF object, ie. the data of the indirect object, or None
+            if the object is free, missing or cannot be parsed.
+
+        """
+
+        cached = self._object_cache.pop(obj_num, None)
+        if cached is not None:
+            self._object_cache[obj_num] = cached
+            if gen_num is not None and gen_num != cached[0]:
+                return None
+
+            self.cache_hits += 1
+            return cached[1]
+
+        entry = self._lookup(obj_num, gen_num)
+        if entry is None:
+            return None
+
+        self.cache_misses += 1
+
+        if isinstance(entry, PDFCrossRefEntry):
+            obj, size = self._load_object(obj_num, entry)
+            entry_gen_num = entry.generation_num
+        else:
+            obj, size = self._load_compressed_object(obj_num, entry)
+            entry_gen_num = 0
+
+        if obj is None:
+            return None
+
+        self._cache_object(obj_num, entry_gen_num, obj, size)
+
+        return obj
+
+    def _load_object(self, obj_num, entry):
+        """Parse an object in use at the offset of a PDFCrossRefEntry.
+
+        Returns:
+            A tuple (data of the indirect object, its size in bytes), or
+            (None, 0).
+
+        """
+
+        self._loading_objects.add(obj_num)
+        try:
+            indirect_obj = self.lexer.get_indirect_object(entry.offset)
+        except PDFLexerError, e:
+            logger.warn('object %s at %s cannot be parsed', obj_num,
+                        entry.offset)
+            return None, 0
+        finally:
+            self._loading_objects.discard(obj_num)
+
+        if indirect_obj.object_num != obj_num:
+            logger.warn('object %s at %s is numbered %s', obj_num,
+                        entry.offset, indirect_obj.object_num)
+
+        return (indirect_obj.data,
+                indirect_obj.end_pos - indirect_obj.start_pos)
+
+    def _load_compressed_object(self, obj_num, entry):
+        """Parse an object in an object stream.
+
+        Args:
+            obj_num: An integer of the object number.
+            entry: An instance of PDFCrossRefCompressedEntry.
+
+        Returns:
+            A tuple (PDF object, its size in bytes), or (None, 0). The
+            positions of the object are in the decoded object stream.
+
+        """
+
+        obj_stream = self.get_object_stream(entry.obj_stream_num)
+        if obj_stream is None:
+            return None, 0
+
+        try:
+            stored_obj_num, obj = obj_stream.get_object(entry.obj_index)
+        except PDFObjectStreamError, e:
+            return None, 0
+
+        if stored_obj_num != obj_num:
+            logger.warn('object %s in object stream %s is numbered %s',
+                        obj_num, entry.obj_stream_num, stored_obj_num)
+
+        return obj, obj.end_pos - obj.start_pos
+
+    def get_object_stream(self, obj_num):
+        """Get a decoded object stream.
+
+        Object streams are decoded once, and kept in a LRU cache
+        bounded by object_stream_cache_bytes, so the objects of a stream
+        do not decode it again.
+
+        Args:
+            obj_num: An integer of the object number of the stream.
+
+        Returns:
+            An instance of PDFObjectStream, or None if the object is not
+            an object stream.
+
+        """
+
+        obj_stream = self._object_stream_cache.pop(obj_num, None)
+        if obj_stream is not None:
+            self._object_stream_cache[obj_num] = obj_stream
+            return obj_stream
+
+        # 7.5.7
+        # object streams are not in object streams, and the stream
+        # objects are not kept in the object cache along with their
+        # decoded data
+        entry = self._lookup(obj_num)
+        if not isinstance(entry, PDFCrossRefEntry):
+            logger.warn('object stream %s is not found', obj_num)
+            return None
+
+        stream_obj, _ = self._load_object(obj_num, entry)
+        if not isinstance(stream_obj, PDFStreamObject):
+            logger.warn('object stream %s is not a stream', obj_num)
+            return None
+
+        try:
+            obj_stream = PDFObjectStream(stream_obj,
+                                         self.lexer.proxy_resolver)
+        except PDFObjectStreamError, e:
+            return None
+
+        self._object_stream_cache[obj_num] = obj_stream
+        self._object_stream_cache_used += len(obj_stream.data)
+
+        while (len(self._object_stream_cache) > 1 and
+               self._object_stream_cache_used >
+               self.object_stream_cache_bytes):
+            _, evicted = self._object_stream_cache.popitem(last=False)
+            self._object_stream_cache_used -= len(evicted.data)
+
+        return obj_stream
+
+    def _cache_object(self, obj_num, gen_num, obj, size):
+        """Keep an object, and drop the least recently used ones beyond
+        the bounds."""
+
+        self._object_cache[obj_num] = (gen_num, obj, size)
+        self._object_cache_used += size
+
+        while (len(self._object_cache) > self.object_cache_size or
+               self._object_cache_used > self.object_cache_bytes):
+            _, (_, _, evicted_size) = self._object_cache.popitem(last=False)
+            self._object_cache_used -= evicted_size
+            self.cache_evictions += 1
+
+    def clear_object_cache(self):
+        """Drop all objects in the object cache and the object stream
+        cache, and reset the counters."""
+
+        self._object_cache.clear()
+        self._object_cache_used = 0
+        self._object_stream_cache.clear()
+        self._object_stream_cache_used = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+
+    def _resolve_value(self, obj_num, gen_num):
+        """The resolver of the lexer, see PDFLexer.
+
+        Returns:
+            The data of the object, or None if it is free, missing, or
+            cannot be resolved yet, ie. while the cross reference table
+            is loading or the object itself is being parsed, eg. a
+            /Length of an xref stream or of its own stream. The lexer
+            then finds the end of the stream by endstream.
+
+        """
+
+        if self._loading_xref or obj_num in self._loading_objects:
+            return None
+
+        obj = self.get_object(obj_num, gen_num)
+
+        return obj.data if obj is not None else None
@@ -11,6 +11,9 @@ from pdfproto.filters import filter_factory
 class PDFBaseObject(object):
     """A base class for PDF 8 basic types of objects.
 
+    Objects are kept in __slots__ rather than a per-instance __dict__,
+    since a document holds a great many of them.
+
     Attribute:
         start_pos: An integer indicating the starting position of the
             data.
@@ -20,6 +23,8 @@ class PDFBaseObject(object):
 
     """
 
+    __slots__ = ('start_pos', 'end_pos', 'data')
+
     def __init__(self):
         self.start_pos = 0
         self.end_pos = 0
@@ -36,6 +41,8 @@ class PDFNumericObject(PDFBaseObject):
 
     """
 
+    __slots__ = ()
+
     def __init__(self):
         super(PDFNumericObject, self).__init__()
 
@@ -48,6 +55,8 @@ class PDFStringObject(PDFBaseObject):
 
     """
 
+    __slots__ = ()
+
     def __init__(self):
         super(PDFStringObject, self).__init__()
 
@@ -62,6 +71,8 @@ class PDFNameObject(PDFBaseObject):
 
     """
 
+    __slots__ = ()
+
     def __init__(self):
         super(PDFNameObject, self).__init__()
 
@@ -69,15 +80,35 @@ class PDFNameObject(PDFBaseObject):
 class PDFDictObject(PDFBaseObject):
     """PDF Dictionary Object
 
+    Only the entries are kept while lexing. data is built from them the
+    first time it is read.
+
     Attributes:
         data: A dict: { string: PDFBaseObject.data }
+        entries: A list of (PDFNameObject, PDFBaseObject) tuples.
 
     """
 
+    __slots__ = ('entries', '_data')
+
     def __init__(self):
-        super(PDFDictObject, self).__init__()
-        self.data = {}
         self.entries = []
+        self._data = None
+        super(PDFDictObject, self).__init__()
+
+    @property
+    def data(self):
+
+        if self._data is None:
+            self._data = dict((key.data, value.data)
+                              for key, value in self.entries)
+
+        return self._data
+
+    @data.setter
+    def data(self, data):
+
+        self._data = data
 
     def add_entry(self, key, value):
         """Add an entry to the associative table.
@@ -89,21 +120,41 @@ class PDFDictObject(PDFBaseObject):
         """
 
         self.entries.append((key, value))
-        self.data[key.data] = value.data
+        if self._data is not None:
+            self._data[key.data] = value.data
 
 
 class PDFArrayObject(PDFBaseObject):
     """PDF Array Object
 
+    Only the entries are kept while lexing. data is built from them the
+    first time it is read.
+
     Attributes:
         data: An array [ PDFBaseObject.data ]
+        entries: A list of PDFBaseObject.
 
     """
 
+    __slots__ = ('entries', '_data')
+
     def __init__(self):
-        super(PDFArrayObject, self).__init__()
         self.entries = []
-        self.data = []
+        self._data = None
+        super(PDFArrayObject, self).__init__()
+
+    @property
+    def data(self):
+
+        if self._data is None:
+            self._data = [value.data for value in self.entries]
+
+        return self._data
+
+    @data.setter
+    def data(self, data):
+
+        self._data = data
 
     def add_entry(self, value):
         """Add an entry to the array.
@@ -114,29 +165,39 @@ class PDFArrayObject(PDFBaseObject):
         """
 
         self.entries.append(value)
-        self.data.append(value.data)
+        if self._data is not None:
+            self._data.append(value.data)
 
 
 class PDFIndirectRefObject(PDFBaseObject):
     """PDF Indirect Object
 
     Attributes:
-        data: [object_number, generation_number]
+        data: [object_number, generation_number], or a PDFObjectProxy
+            if the lexer makes proxies.
         object_num: An integer of the object number
         generation_num: An integer of the generation number.
 
     """
 
+    __slots__ = ()
+
     def __init__(self):
         super(PDFIndirectRefObject, self).__init__()
 
     @property
     def object_num(self):
-        return self.data[0]
+        if isinstance(self.data, tuple):
+            return self.data[0]
+
+        return self.data.object_num
 
     @property
     def generation_num(self):
-        return self.data[1]
+        if isinstance(self.data, tuple):
+            return self.data[1]
+
+        return self.data.generation_num
 
 
 class PDFBooleanObject(PDFBaseObject):
@@ -147,6 +208,8 @@ class PDFBooleanObject(PDFBaseObject):
 
     """
 
+    __slots__ = ()
+
     def __init__(self):
         super(PDFBooleanObject, self).__init__()
 
@@ -159,6 +222,8 @@ class PDFNullObject(PDFBaseObject):
 
     """
 
+    __slots__ = ()
+
     def __init__(self):
         super(PDFNullObject, self).__init__()
 
@@ -173,6 +238,8 @@ class PDFIndirectObject(PDFBaseObject):
 
     """
 
+    __slots__ = ('object_num', 'generation_num')
+
     def __init__(self):
         super(PDFIndirectObject, self).__init__()
         self.object_num = 0
@@ -182,25 +249,86 @@ class PDFIndirectObject(PDFBaseObject):
 class PDFStreamObject(PDFBaseObject):
     """PDF Stream Object
 
+    The raw data is not copied out of the file when the stream is
+    lexed. Only its position in source is kept, and the bytes are
+    sliced out when raw_data is read, eg. by decode().
+
     Attributes:
-        data: A sequence of zero ob more bytes.
+        data: A sequence of zero ob more bytes. Before decode() is
+            called, it is the same as raw_data.
         raw_data: A sequence of bytes. (may be compressed)
         stream_dict: An instance of PDFDictObject.
+        source: A buffer, eg. the memory mapped file, containing the
+            raw data. It must stay open until the stream is decoded.
+        data_offset: An integer indicating where the raw data starts
+            in source.
+        data_length: An integer of the number of bytes of raw data.
 
     """
 
+    __slots__ = ('stream_dict', 'source', 'data_offset', 'data_length',
+                 '_raw_data', '_decoded_data')
+
     def __init__(self):
-        super(PDFStreamObject, self).__init__()
         self.stream_dict = None
-        self.raw_data = None
+        self.source = None
+        self.data_offset = 0
+        self.data_length = 0
+        self._raw_data = None
+        self._decoded_data = None
+        super(PDFStreamObject, self).__init__()
+
+    def set_source(self, source, data_offset, data_length):
+        """Refer the raw data to a range of source without copying.
+
+        Args:
+            source: A buffer, eg. the memory mapped file.
+            data_offset: An integer of the starting position.
+            data_length: An integer of the number of bytes.
+
+        """
+
+        self.source = source
+        self.data_offset = data_offset
+        self.data_length = data_length
+        self._raw_data = None
+
+    @property
+    def raw_data(self):
+
+        if self._raw_data is not None:
+            return self._raw_data
+
+        if self.source is not None:
+            return self.source[self.data_offset:
+                               (self.data_offset + self.data_length)]
+
+        return None
+
+    @raw_data.setter
+    def raw_data(self, raw_data):
+
+        self._raw_data = raw_data
+        self.source = None
+
+    @property
+    def data(self):
+
+        if self._decoded_data is None:
+            return self.raw_data
+
+        return self._decoded_data
+
+    @data.setter
+    def data(self, data):
+
+        self._decoded_data = data
 
     def decode(self):
 
-        if self.raw_data is None:
+        if self._raw_data is None and self.source is None:
             return self.data
 
-        stream_dict = self.stream_dict.data
-
         filters = self._get_filters()
         decode_params = self._get_decode_params()
 
@@ -217,7 +345,7 @@ class PDFStreamObject(PDFBaseObject):
 
     def get_decoded_data(self):
 
-        if self.raw_data is not None:
+        if self._raw_data is not None or self.source is not None:
             return self.decode()
 
         return self.data
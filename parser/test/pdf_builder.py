@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+# standard library import
+
+# third party related import
+
+# local library import
+
+
+def make_pdf(objects):
+    """Build a PDF of the objects, numbered from 1, object 1 being the
+    catalog.
+
+    Args:
+        objects: A list of strings of the objects.
+
+    Returns:
+        A string of the PDF with a cross reference table.
+
+    """
+
+    content = '%PDF-1.4\n'
+    offsets = []
+    for obj_num, obj in enumerate(objects, 1):
+        offsets.append(len(content))
+        content += '%d 0 obj\n%s\nendobj\n' % (obj_num, obj)
+
+    xref_pos = len(content)
+    content += 'xref\n0 %d\n0000000000 65535 f\r\n' % (len(objects) + 1)
+    content += ''.join('%010d 00000 n\r\n' % offset for offset in offsets)
+    content += 'trailer\n<</Size %d /Root 1 0 R>>\n' % (len(objects) + 1)
+    content += 'startxref\n%d\n%%%%EOF\n' % xref_pos
+
+    return content
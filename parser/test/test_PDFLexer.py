@@ -3,6 +3,7 @@ from contextlib import closing
 import json
 import mmap
 import random
+import sys
 from tempfile import NamedTemporaryFile
 
 # third party related imports
@@ -49,6 +50,40 @@ class TestPDFLexer:
                 with pytest.raises(PDFLexerError):
                     numeric_object = p.get_number(0)
 
+    def test_get_next_token(self):
+
+        test_data = (
+            ('  /a', '/', 2),
+            ('% comment\r\n\t123', '1', 12),
+            ('%a\n%b\r\n  %c\r(', '(', 12),
+            ('\0\t\n\f\r [', '[', 6),
+        )
+
+        for content, expect_ch, expect_pos in test_data:
+            with closing(NamedTemporaryFile()) as f:
+                f.write(content)
+                f.flush()
+
+                with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                    p = PDFLexer(stream)
+                    assert p.get_next_token(0) == (expect_ch, expect_pos)
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(' \r\n% trailing comment')
+            f.flush()
+
+            with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                p = PDFLexer(stream)
+                assert p.get_next_token(0) == (None, 21)
+                assert p.get_obj(0) is None
+
+        # a comment to the end of the buffer hides no token
+        for content, pos in [('% 12', 0), ('[1 2] % 7', 5)]:
+            p = PDFLexer(content)
+            assert p.get_next_token(pos) == (None, len(content))
+            assert p.get_obj(pos) is None
+            assert p.skip_obj(pos) is None
+
     def test_get_literal_string(self):
 
         test_data = (
@@ -71,7 +106,13 @@ class TestPDFLexer:
             ('\n\n\n', '\n'),
             ('\r\r\r', '\n'),
             ('\r\n\r\n', '\n'),
-            ('\\n\\r\\t\\b\\f\\(\\)\\\\', '\n\r\t\b\f()\\')
+            ('\\n\\r\\t\\b\\f\\(\\)\\\\', '\n\r\t\b\f()\\'),
+            ('(a(b)c)', '(a(b)c)'),
+            ('a\\\\(b)', 'a\\(b)'),
+            ('unbalanced \\( and \\)\\)', 'unbalanced ( and ))'),
+            ('line\\\ncontinued\\\r\nhere\\\r', 'linecontinuedhere'),
+            ('\\0053\\53\\5x\\501', '\0053\053\005x\101'),
+            ('\\q', 'q'),
         )
 
         for (literal, expect_val) in test_data:
@@ -157,6 +198,37 @@ class TestPDFLexer:
                 assert string_object.start_pos == 0
                 assert string_object.end_pos == len(hex_str) + 2
 
+    def test_get_hexadecimal_string2(self):
+
+        test_data = (
+            ('<901FA>', '\x90\x1f\xa0'),
+            ('<90 1f\r\nA>', '\x90\x1f\xa0'),
+            ('<\t>', ''),
+            ('<4E6F762073686D6F7A206B6120706F702E>', 'Nov shmoz ka pop.'),
+        )
+
+        for hex_str, expect_val in test_data:
+            with closing(NamedTemporaryFile()) as f:
+                f.write(hex_str)
+                f.write(self._rand_white_space() + self._rand_string(8))
+                f.flush()
+
+                with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                    p = PDFLexer(stream)
+                    string_object = p.get_hexadecimal_string(0)
+                    assert string_object.data == expect_val
+                    assert string_object.end_pos == len(hex_str)
+
+        for hex_str in ('<12G4>', '<1234'):
+            with closing(NamedTemporaryFile()) as f:
+                f.write(hex_str)
+                f.flush()
+
+                with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                    p = PDFLexer(stream)
+                    with pytest.raises(PDFLexerError):
+                        p.get_hexadecimal_string(0)
+
     def test_get_name(self):
 
         test_data = (
@@ -187,6 +259,29 @@ class TestPDFLexer:
                     assert name_object.start_pos == 0
                     assert name_object.end_pos == len(name)
 
+    def test_get_name_cache(self):
+
+        test_data = '<</Type /lime#20Green /Kids [/Type /lime#20Green]>> /Extra'
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(test_data)
+            f.flush()
+
+            with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                p = PDFLexer(stream)
+                d = p.get_dictionary(0)
+                key, value = d.entries[0]
+                names = d.entries[1][1].entries
+
+                assert value.data == 'lime Green'
+                assert names[0].data is key.data
+                assert names[1].data is value.data
+                assert names[0].start_pos == test_data.index('/Type', 3)
+
+                p.NAME_CACHE_SIZE = len(p._name_cache)
+                assert p.get_name(test_data.index('/Extra')).data == 'Extra'
+                assert 'Extra' not in p._name_cache
+
     def test_get_indirect_reference(self):
 
         with closing(NamedTemporaryFile()) as f:
@@ -255,6 +350,43 @@ class TestPDFLexer:
 
         self._test_by_json_dump(test_data, test_data_dict)
 
+    def testget_dictionary3(self):
+
+        test_data = """<</Type /Pages /Kids [1 0 R 2 0 R]
+                         /Widths [1 2 (]) <</A >>]
+                         /Count 2 /Resources <</Font <</F1 3 0 R>>>>
+                       >>"""
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(test_data)
+            f.flush()
+
+            with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                p = PDFLexer(stream)
+                d = p.get_dictionary(0, ['Type', 'Count', 'Kids', 'Parent'])
+                assert d.data == {'Type': 'Pages', 'Kids': [(1, 0), (2, 0)],
+                                  'Count': 2}
+                assert d.end_pos == len(test_data)
+
+                d = p.get_dictionary(0, [])
+                assert d.data == {}
+                assert d.end_pos == len(test_data)
+
+    def test_get_indirect_object_keys(self):
+
+        test_data = '5 0 obj <</Length 3 /Big [1 2 3] /W [1 2 1]>>stream\nabc\nendstream endobj'
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(test_data)
+            f.flush()
+
+            with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                p = PDFLexer(stream)
+                obj = p.get_indirect_object(0, ['W'])
+                assert obj.end_pos == len(test_data)
+                assert obj.data.stream_dict.data == {'Length': 3, 'W': [1, 2, 1]}
+                assert obj.data.data == 'abc'
+
     def test_get_array1(self):
 
         self._test_by_json_dump("[]", [], False)
@@ -270,6 +402,84 @@ class TestPDFLexer:
 
         self._test_by_json_dump("[[[[1]]]]", [[[[1]]]], False)
 
+    def test_get_array4(self):
+
+        self._test_by_json_dump("[0 0 612 792]", [0, 0, 612, 792], False)
+        self._test_by_json_dump("[1 2 R 3 0 R 4 5]", [[1, 2], [3, 0], 4, 5],
+                                False)
+        self._test_by_json_dump("[1\n0\rR 2 0 /R 7]",
+                                [[1, 0], 2, 0, 'R', 7], False)
+        self._test_by_json_dump("[-1 2 0 R 1.0 2 0 R]", [-1, [2, 0], 1.0, [2, 0]],
+                                False)
+
+    def test_get_array5(self):
+
+        self._test_by_json_dump("[<</A [1 <<>>]>> [] <</B <</C [[2]]>>>>]",
+                                [{'A': [1, {}]}, [], {'B': {'C': [[2]]}}],
+                                False)
+
+        depth = sys.getrecursionlimit() * 2
+        for test_data in ('[' * depth + ']' * depth,
+                          '<</K ' * (depth - 1) + '<<' + '>>' * depth):
+            with closing(NamedTemporaryFile()) as f:
+                f.write(test_data)
+                f.flush()
+
+                with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                    p = PDFLexer(stream)
+                    obj = p.get_obj(0)
+                    assert obj.end_pos == len(test_data)
+
+                    for i in xrange(depth - 1):
+                        assert len(obj.entries) == 1
+                        obj = obj.entries[0]
+                        if isinstance(obj, tuple):
+                            obj = obj[1]
+                    assert obj.entries == []
+
+    def test_get_array6(self):
+
+        for test_data in ('[1 2', '[1 >>]', '[<</A 1]>>]', '<</A [1>>',
+                          '<</A>>', '<<1 2>>'):
+            with closing(NamedTemporaryFile()) as f:
+                f.write(test_data)
+                f.flush()
+
+                with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                    p = PDFLexer(stream)
+                    with pytest.raises(PDFLexerError):
+                        p.get_obj(0)
+
+    def test_skip_obj(self):
+
+        test_data = (
+            '123', '-0.5', '/Name#20', '(a (b) \\) c)', '<4E6F>', 'true',
+            'false', 'null', '5 0 R', '[]', '[1 [2 (]) <5D>] % ]\n 3]',
+            '<</A <</B [<<>>]>> /C (>>) /D <3E3E>>>',
+            '7 0 obj <</Length 3>> stream\n)]>\nendstream endobj',
+        )
+
+        for obj_str in test_data:
+            with closing(NamedTemporaryFile()) as f:
+                f.write(obj_str)
+                f.write(self._rand_white_space() + self._rand_string(8))
+                f.flush()
+
+                with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                    p = PDFLexer(stream)
+                    obj = p.get_obj(0)
+                    assert p.skip_obj(0) == (len(obj_str), type(obj))
+
+        for obj_str in ('[1 2', '[1 >>]', '<</A [1>>', '[1 ) 2]', '(a'):
+            with closing(NamedTemporaryFile()) as f:
+                f.write(obj_str)
+                f.flush()
+
+                with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                    p = PDFLexer(stream)
+                    with pytest.raises(PDFLexerError):
+                        p.skip_obj(0)
+
     def test_get_indirect_object(self):
 
         test_data = (
@@ -298,6 +508,7 @@ class TestPDFLexer:
                   'e': 'billing', 'f': 'billing', 'g': None,
                   'h': {}}),
                 ("""7 0 obj [/a /b 1 2 3 0 R] endobj""", 7, 0, ['a', 'b', 1, 2, [3, 0]]),
+                ("""8 3 obj 9 0 R endobj""", 8, 3, [9, 0]),
         )
 
         for test_str, obj_num, gen_num, data in test_data:
@@ -347,3 +558,93 @@ class TestPDFLexer:
                 assert s.start_pos == 0
                 assert s.end_pos == 5 + 6 + len(eol1) + len(data) + len(eol2) + 8 + 1
                 assert s.stream_dict.data == {}
+
+    def test_get_stream_by_length(self):
+
+        data = 'abc\nendstream\ndef'
+
+        # direct /Length, data contains keyword endstream
+        with closing(NamedTemporaryFile()) as f:
+            content = '<</Length %s>>\nstream\n%s\nendstream' % (len(data),
+                                                               data)
+            f.write(content)
+            f.flush()
+
+            with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                p = PDFLexer(stream)
+                s = p.get_stream(0)
+                assert s.data == data
+                assert s.end_pos == len(content)
+
+        # indirect /Length
+        with closing(NamedTemporaryFile()) as f:
+            content = '<</Length 9 0 R>>\nstream\r\n%s\r\nendstream' % data
+            f.write(content)
+            f.flush()
+
+            with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                resolved = []
+
+                def resolver(object_num, generation_num):
+                    resolved.append((object_num, generation_num))
+                    return len(data)
+
+                p = PDFLexer(stream, resolver)
+                s = p.get_stream(0)
+                assert resolved == [(9, 0)]
+                assert s.data == data
+                assert s.end_pos == len(content)
+
+                # unresolvable /Length falls back to keyword scan
+                p = PDFLexer(stream)
+                s = p.get_stream(0)
+                assert s.data == 'abc'
+
+        # wrong /Length falls back to keyword scan
+        with closing(NamedTemporaryFile()) as f:
+            content = '<</Length 1>>\nstream\nabcdef\nendstream'
+            f.write(content)
+            f.flush()
+
+            with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                p = PDFLexer(stream)
+                s = p.get_stream(0)
+                assert s.data == 'abcdef'
+                assert s.end_pos == len(content)
+
+    def test_memo(self):
+
+        test_data = '1 0 obj <</A [1 2]>> endobj 2 0 obj (x) endobj 3 0 obj null endobj'
+        positions = [test_data.index('%d 0 obj' % i) for i in (1, 2, 3)]
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(test_data)
+            f.flush()
+
+            with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                p = PDFLexer(stream, memo_size=2)
+                obj1 = p.get_indirect_object(positions[0])
+                assert p.get_indirect_object(positions[0]) is obj1
+                assert (p.memo_hits, p.memo_misses) == (1, 1)
+
+                # the dictionary is got by its own method
+                d = p.get_dictionary(obj1.data.start_pos)
+                assert d is not obj1.data
+                assert d.data == {'A': [1, 2]}
+
+                # least recently used objects are dropped
+                obj2 = p.get_indirect_object(positions[1])
+                assert p.get_indirect_object(positions[0]) is not obj1
+                assert p.get_indirect_object(positions[1]) is obj2
+                assert len(p._memo) == 2
+
+                # projected dictionaries are not kept
+                assert p.get_dictionary(d.start_pos, ['B']).data == {}
+                assert p.get_dictionary(d.start_pos, ['B']) is not d
+
+                p.clear_memo()
+                assert (p.memo_hits, p.memo_misses, len(p._memo)) == (0, 0, 0)
+
+                p = PDFLexer(stream)
+                assert p.get_obj(positions[2]) is not p.get_obj(positions[2])
+                assert (p.memo_hits, p.memo_misses) == (0, 0)
@@ -0,0 +1,50 @@
+# standard library import
+
+# third party related import
+
+# local library import
+from pdfproto.parser.PDFObjectProxy import PDFObjectProxy
+from pdfproto.parser.pdf_objects import PDFArrayObject
+
+
+class TestPDFObjectProxy:
+
+    def test_resolve(self):
+
+        resolved = []
+
+        def resolver(obj_num, gen_num):
+            resolved.append((obj_num, gen_num))
+            array_obj = PDFArrayObject()
+            array_obj.data = [obj_num, 'x']
+            return array_obj
+
+        proxy = PDFObjectProxy(7, 0, resolver)
+
+        # neither comparing nor hashing resolves
+        assert proxy == (7, 0)
+        assert proxy != (7, 1)
+        assert proxy == PDFObjectProxy(7, 0, None)
+        assert {(7, 0): 'seven'}[proxy] == 'seven'
+        assert repr(proxy) == 'PDFObjectProxy(7, 0)'
+        assert proxy
+        assert resolved == []
+
+        assert proxy[0] == 7
+        assert len(proxy) == 2
+        assert list(proxy) == [7, 'x']
+        assert 'x' in proxy
+        assert proxy.index('x') == 1
+        assert proxy.resolved
+        assert resolved == [(7, 0)]
+
+    def test_unresolved(self):
+
+        proxy = PDFObjectProxy(7, 0, lambda obj_num, gen_num: None)
+
+        assert proxy.value is None
+        assert proxy.resolved
+
+        # true as a reference, even to nothing or to an empty array
+        assert proxy
+        assert PDFObjectProxy(7, 0, lambda obj_num, gen_num: PDFArrayObject())
@@ -0,0 +1,63 @@
+# standard library import
+import zlib
+
+# third party related import
+import pytest
+
+# local library import
+from pdfproto.parser.PDFLexer import PDFLexer
+from pdfproto.parser.PDFObjectStream import *
+
+
+class TestPDFObjectStream:
+
+    def make_stream(self, stream_dict, data):
+
+        source = '%s\nstream\n%s\nendstream' % (stream_dict, data)
+
+        return PDFLexer(source).get_stream(0)
+
+    def test_get_object(self):
+
+        objects = '<</Type /Pages /Count 2>> [1 2 (three)] 42'
+        header = '11 0 12 26 13 40 '
+        data = zlib.compress(header + objects)
+
+        stream_obj = self.make_stream(
+                '<</Type /ObjStm /N 3 /First %d /Filter /FlateDecode '
+                '/Length %d>>' % (len(header), len(data)), data)
+
+        obj_stream = PDFObjectStream(stream_obj)
+
+        assert len(obj_stream) == 3
+        assert list(obj_stream.object_nums) == [11, 12, 13]
+
+        obj_num, obj = obj_stream.get_object(0)
+        assert obj_num == 11
+        assert obj.data == {'Type': 'Pages', 'Count': 2}
+
+        obj_num, obj = obj_stream.get_object(1)
+        assert obj_num == 12
+        assert obj.data == [1, 2, 'three']
+
+        assert obj_stream.get_object(2)[1].data == 42
+
+        with pytest.raises(PDFObjectStreamError):
+            obj_stream.get_object(3)
+
+    def test_invalid(self):
+
+        with pytest.raises(PDFObjectStreamError):
+            PDFObjectStream(self.make_stream('<</Type /XRef /Length 1>>', '1'))
+
+        with pytest.raises(PDFObjectStreamError):
+            PDFObjectStream(self.make_stream(
+                    '<</Type /ObjStm /N 2 /First 4 /Length 6>>', '1 0 2'))
+
+        # a corrupt or unknown filter
+        for filters, data in [('/FlateDecode', '\xff\xff\xff\xff'),
+                              ('/NoSuchDecode', '1 0 ')]:
+            with pytest.raises(PDFObjectStreamError):
+                PDFObjectStream(self.make_stream(
+                        '<</Type /ObjStm /N 1 /First 4 /Filter %s '
+                        '/Length 4>>' % filters, data))
@@ -1,13 +1,16 @@
 # standard library import
 from contextlib import closing
 import random
+import struct
 from tempfile import NamedTemporaryFile
+import zlib
 
 # third party related import
 import pytest
 
 # local library import
 from pdfproto.parser.PDFParser import *
+from pdfproto.parser.test.pdf_builder import make_pdf
 
 
 class TestPDFParser:
@@ -73,33 +76,6 @@ class TestPDFParser:
                 p.open(f.name)
                 p.get_header()
 
-    def test_reverse_line(self):
-
-        num_lines = random.randint(0, 10000)
-        lines = []
-        CR, LF = ord('\r'), ord('\n')
-
-        for i in xrange(num_lines):
-            num_bytes = self.rand_byte()
-            bunch_bytes = map(lambda i: self.rand_byte(), xrange(num_bytes))
-            bunch_bytes = filter(lambda b: b != CR and b != LF, bunch_bytes)
-            lines.append(bytearray(bunch_bytes))
-
-        with closing(NamedTemporaryFile()) as f:
-            for ba in lines:
-                eol = random.choice(('\r', '\n', '\r\n'))
-                f.write(ba + eol)
-
-            f.flush()
-
-            p = PDFParser()
-            p.open(f.name)
-
-            output_lines = [line for line in p._reverse_lines()]
-            output_lines = filter(lambda line: len(line) != 0, output_lines)
-            output_lines.reverse()
-            assert output_lines == filter(lambda line: len(line) != 0, lines)
-
     def test_next_lines(self):
 
         num_lines = random.randint(0, 10000)
@@ -158,6 +134,44 @@ class TestPDFParser:
             for ix, ol in enumerate(output_lines):
                 assert ol == expect_lines[ix]
 
+    def test_next_lines_chunk(self):
+
+        content = 'xref\r\n0 1 % comment\r0000000000 65535 f\r\n\ntrailer'
+        expect_lines = [('xref', 0), ('0 1 ', 6), ('0000000000 65535 f', 20),
+                        ('', 40), ('trailer', 41)]
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(content)
+            f.flush()
+
+            p = PDFParser()
+            p.open(f.name)
+
+            for chunk_size in (1, 2, 5, 7, 1024):
+                p.LINE_CHUNK_SIZE = chunk_size
+                assert list(p.next_lines(ensure_pos=True)) == expect_lines
+                assert list(p.next_lines(6, ensure_pos=True)) == expect_lines[1:]
+                assert p.stream.tell() == 0
+
+    def test_get_line(self):
+
+        content = 'xref\r\n0 1 % comment\r0000000000 65535 f\r\n\ntrailer'
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(content)
+            f.flush()
+
+            p = PDFParser()
+            p.open(f.name)
+
+            assert p.get_line(0) == ('xref', 6)
+            assert p.get_line(6) == ('0 1 ', 20)
+            assert p.get_line(6, skip_comment=False) == ('0 1 % comment', 20)
+            assert p.get_line(40) == ('', 41)
+            assert p.get_line(41) == ('trailer', 48)
+            assert p.get_line(48) == (None, 48)
+            assert p.stream.tell() == 0
+
     def rand_byte(self):
         """Get an integer 0 <= x <= 255"""
 
@@ -186,3 +200,211 @@ class TestPDFParser:
             p.open(f.name)
             assert p.get_xref_pos() == pos
 
+    def test_find_startxref(self):
+
+        with closing(NamedTemporaryFile()) as f:
+            content = '%PDF-1.4\nstartxref\n1\n%%EOF\n'
+            eof_pos = [len(content) - 6]
+            content += 'startxref\r\n 22\r\n%%EOF\r\n'
+            eof_pos.append(len(content) - 7)
+            content += '\0' * (PDFParser.TAIL_WINDOW_SIZE * 5)
+
+            f.write(content)
+            f.flush()
+
+            p = PDFParser()
+            p.open(f.name)
+            assert p.find_startxref() == (22, eof_pos)
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write('%PDF-1.4\n%%EOF')
+            f.flush()
+
+            p = PDFParser()
+            p.open(f.name)
+            assert p.find_startxref() == (0, [9])
+
+    def test_get_object(self):
+
+        objects = [
+                '<</Type /Catalog /Pages 2 0 R>>',
+                '<</Type /Pages /Kids [] /Count 0>>',
+                '<</Length 4 0 R>>\nstream\nabc\nendstream',
+                '3',
+        ]
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(make_pdf(objects))
+            f.flush()
+
+            p = PDFParser()
+            p.open(f.name)
+
+            catalog = p.get_object(1)
+            assert catalog.data['Pages'] == (2, 0)
+            assert p.get_object(1, 0) is catalog
+            assert p.get_object(1, 1) is None
+            assert p.get_object(0) is None
+            assert p.get_object(5) is None
+
+            # indirect /Length
+            assert p.get_object(3).raw_data == 'abc'
+
+            assert (p.cache_hits, p.cache_misses, p.cache_evictions) == (1, 3, 0)
+
+            p.clear_object_cache()
+            assert p.get_object(1) is not catalog
+            assert (p.cache_hits, p.cache_misses) == (0, 1)
+
+    def test_get_object_eviction(self):
+
+        objects = ['<</Index %d>>' % ix for ix in xrange(10)]
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(make_pdf(objects))
+            f.flush()
+
+            p = PDFParser(object_cache_size=3)
+            p.open(f.name)
+
+            for obj_num in [1, 2, 3, 1, 4, 1]:
+                p.get_object(obj_num)
+
+            assert (p.cache_hits, p.cache_misses, p.cache_evictions) == (2, 4, 1)
+
+            # 2 was dropped, 1 was used recently
+            p.get_object(2)
+            assert p.cache_misses == 5
+            assert p.get_object(1).data == {'Index': 0}
+            assert p.cache_hits == 3
+
+            # each object is 27 bytes long
+            p = PDFParser(object_cache_bytes=60)
+            p.open(f.name)
+
+            for obj_num in [1, 2, 3]:
+                p.get_object(obj_num)
+
+            assert p.cache_evictions == 1
+            p.get_object(2)
+            assert p.cache_hits == 1
+
+    def test_get_object_compressed(self):
+
+        objects = '<</Index 0>> <</Index 1>> <</Index 2>> '
+        header = '2 0 3 13 4 26 '
+        obj_stream = zlib.compress(header + objects)
+
+        content = '%PDF-1.5\n'
+        obj_stream_pos = len(content)
+        content += ('1 0 obj\n<</Type /ObjStm /N 3 /First %d '
+                    '/Filter /FlateDecode /Length %d>>\nstream\n%s\n'
+                    'endstream\nendobj\n' % (len(header), len(obj_stream),
+                                             obj_stream))
+
+        # W [1 4 1], objects 0 to 5
+        xref_pos = len(content)
+        rows = [(0, 0, 255), (1, obj_stream_pos, 0), (2, 1, 0), (2, 1, 1),
+                (2, 1, 2), (1, xref_pos, 0)]
+        xref_data = ''.join(struct.pack('>BIB', *row) for row in rows)
+        content += ('5 0 obj\n<</Type /XRef /Size 6 /W [1 4 1] /Length %d>>\n'
+                    'stream\n%s\nendstream\nendobj\n' % (len(xref_data),
+                                                         xref_data))
+        content += 'startxref\n%d\n%%%%EOF\n' % xref_pos
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(content)
+            f.flush()
+
+            p = PDFParser()
+            p.open(f.name)
+
+            assert p.get_object(3).data == {'Index': 1}
+            assert p.get_object(4, 0).data == {'Index': 2}
+            assert p.get_object(2, 1) is None
+            assert p.get_object(2).data == {'Index': 0}
+
+            # decoded once
+            assert p.get_object_stream(1) is p.get_object_stream(1)
+            assert p.get_object_stream(5) is None
+
+        # the object stream is corrupt
+        content = content.replace(obj_stream, '\xff' * len(obj_stream))
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(content)
+            f.flush()
+
+            p = PDFParser()
+            p.open(f.name)
+
+            assert p.get_object_stream(1) is None
+            assert p.get_object(3) is None
+
+    def test_get_object_indirect_length(self):
+
+        content = '%PDF-1.5\n'
+        obj_pos = len(content)
+        content += '1 0 obj\n<</Length 1 0 R>>\nstream\nabc\nendstream\nendobj\n'
+        length_pos = len(content)
+        content += '3 0 obj\n24\nendobj\n'
+
+        # W [1 4 1], objects 0 to 3 in 24 bytes, and /Length of the
+        # xref stream is an object listed in it
+        xref_pos = len(content)
+        rows = [(0, 0, 255), (1, obj_pos, 0), (1, xref_pos, 0),
+                (1, length_pos, 0)]
+        xref_data = ''.join(struct.pack('>BIB', *row) for row in rows)
+        content += ('2 0 obj\n<</Type /XRef /Size 4 /W [1 4 1] /Length 3 0 R>>\n'
+                    'stream\n%s\nendstream\nendobj\n' % xref_data)
+        content += 'startxref\n%d\n%%%%EOF\n' % xref_pos
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(content)
+            f.flush()
+
+            p = PDFParser()
+            p.open(f.name)
+            assert p.get_xref_table().lookup(1).offset == obj_pos
+
+            # the stream whose /Length is itself ends at endstream
+            p = PDFParser()
+            p.open(f.name)
+            assert p.get_object(1).raw_data == 'abc'
+            assert p.get_object(3).data == 24
+
+    def test_lazy_refs(self):
+
+        objects = [
+                '<</Type /Catalog /Pages 2 0 R>>',
+                '<</Type /Pages /Kids [3 0 R] /Count 1>>',
+                '<</Type /Page /Parent 2 0 R /Resources 4 0 R>>',
+                '<</Font <</F1 5 0 R>>>>',
+                '<</Type /Font>>',
+        ]
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(make_pdf(objects))
+            f.flush()
+
+            p = PDFParser(lazy_refs=True)
+            p.open(f.name)
+
+            pages = p.get_object(1).data['Pages']
+            assert pages == (2, 0)
+            assert not pages.resolved
+            assert p.cache_misses == 1
+
+            page = pages['Kids'][0]
+            assert page['Type'] == 'Page'
+            assert p.cache_misses == 3
+
+            # the cycle is not followed, and the font is not read
+            assert page['Parent'] == pages
+            assert page['Parent']['Count'] == 1
+            assert p.cache_misses == 3
+            assert 'F1' in page['Resources']['Font']
+            assert p.cache_misses == 4
+
+            assert page['Resources'].get('XObject') is None
+            assert len(page['Resources']) == 1
@@ -49,3 +49,63 @@ endobj"""
 
                 stream_data = stream_obj.decode()
 
+
+    def test_lazy_raw_data(self):
+
+        raw = 'abc\x00\xff'
+        test_data = '1 0 obj <</Length 5>> stream\n%s\nendstream endobj' % raw
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(test_data)
+            f.flush()
+
+            with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                p = PDFLexer(stream)
+                stream_obj = p.get_indirect_object(0).data
+
+                assert stream_obj.source is stream
+                assert stream_obj.data_offset == test_data.index(raw)
+                assert stream_obj.data_length == len(raw)
+                assert stream_obj.raw_data == raw
+                assert stream_obj.data == raw
+
+                assert stream_obj.get_decoded_data() == raw
+                assert stream_obj.source is None
+                assert stream_obj.raw_data is None
+                assert stream_obj.data == raw
+
+
+class TestPDFContainerObject:
+
+    def test_lazy_data(self):
+
+        test_data = '<</A [1 (x) /N] /B <</C null>> /D true>>'
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(test_data)
+            f.flush()
+
+            with closing(mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)) as stream:
+                p = PDFLexer(stream)
+                d = p.get_dictionary(0)
+
+                assert d._data is None
+                assert [key.data for key, value in d.entries] == ['A', 'B', 'D']
+                assert d.data == {'A': [1, 'x', 'N'], 'B': {'C': None}, 'D': True}
+                assert d.data is d.data
+
+                array = d.entries[0][1]
+                assert array.entries[1].data == 'x'
+                assert array.entries[1].start_pos == test_data.index('(x)')
+
+                key, value = d.entries[2]
+                array.add_entry(value)
+                assert d.data['A'] == [1, 'x', 'N', True]
+
+    def test_slots(self):
+
+        for cls in (PDFNumericObject, PDFStringObject, PDFNameObject,
+                    PDFDictObject, PDFArrayObject, PDFIndirectRefObject,
+                    PDFBooleanObject, PDFNullObject, PDFIndirectObject,
+                    PDFStreamObject):
+            assert not hasattr(cls(), '__dict__')
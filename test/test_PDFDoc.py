@@ -0,0 +1,110 @@
+# standard library import
+from contextlib import closing
+from tempfile import NamedTemporaryFile
+
+# third party related import
+import pytest
+
+# local library import
+from pdfproto.PDFDoc import *
+
+
+class TestPDFDoc:
+
+    def make_update(self, content, objects, trailer):
+        """Append the objects, their xref section and a trailer."""
+
+        offsets = []
+        for obj_num, obj in objects:
+            offsets.append((obj_num, len(content)))
+            content += '%d 0 obj\n%s\nendobj\n' % (obj_num, obj)
+
+        xref_pos = len(content)
+        content += 'xref\n0 1\n0000000000 65535 f\r\n'
+        for obj_num, offset in offsets:
+            content += '%d 1\n%010d 00000 n\r\n' % (obj_num, offset)
+        content += 'trailer\n%s\nstartxref\n%d\n%%%%EOF\n' % (trailer,
+                                                            xref_pos)
+
+        return content, xref_pos
+
+    def test_open_metadata(self):
+
+        content, xref_pos = self.make_update('%PDF-1.6\n', [
+                (1, '<</Type /Catalog /Pages 2 0 R>>'),
+                (2, '<</Type /Pages /Kids [] /Count 12>>'),
+                (3, '<</Title (Old)>>'),
+        ], '<</Size 4 /Root 1 0 R /Info 3 0 R>>')
+
+        # the update changes the catalog only
+        content, _ = self.make_update(content, [
+                (1, '<</Type /Catalog /Pages 2 0 R /Lang (en)>>'),
+        ], '<</Size 4 /Root 1 0 R /Info 3 0 R /Prev %d '
+           '/ID [<0102> <0304>] /Encrypt 5 0 R>>' % xref_pos)
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(content)
+            f.flush()
+
+            doc = PDFDoc()
+            metadata = doc.open_metadata(f.name)
+
+            assert metadata == ('1.6', {'Title': 'Old'},
+                                ['\x01\x02', '\x03\x04'], 12, True)
+            assert metadata.page_count == 12
+            assert len(doc.parser.xref_table.trailers) == 2
+
+    def test_open_metadata_newest(self):
+
+        content, xref_pos = self.make_update('%PDF-1.4\n', [
+                (1, '<</Type /Catalog /Pages 2 0 R>>'),
+                (2, '<</Type /Pages /Kids [] /Count 0>>'),
+        ], '<</Size 3 /Root 1 0 R>>')
+
+        content, _ = self.make_update(content, [
+                (1, '<</Type /Catalog /Pages 2 0 R>>'),
+                (2, '<</Type /Pages /Kids [] /Count 3>>'),
+        ], '<</Size 3 /Root 1 0 R /Prev %d>>' % xref_pos)
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(content)
+            f.flush()
+
+            doc = PDFDoc()
+            metadata = doc.open_metadata(f.name)
+
+            assert metadata == ('1.4', None, None, 3, False)
+
+            # the older section is not read
+            assert len(doc.parser.xref_table.trailers) == 1
+
+    def test_open_recover(self):
+
+        content, xref_pos = self.make_update('%PDF-1.4\n', [
+                (1, '<</Type /Catalog /Pages 2 0 R>>'),
+                (2, '<</Type /Pages /Kids [] /Count 0>>'),
+        ], '<</Size 3 /Root 1 0 R>>')
+
+        # /Prev points into the header, the older section is read only
+        # when object 2 is looked up
+        content, _ = self.make_update(content, [
+                (1, '<</Type /Catalog /Pages 2 0 R /Lang (en)>>'),
+        ], '<</Size 3 /Root 1 0 R /Prev 3>>')
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(content)
+            f.flush()
+
+            doc = PDFDoc()
+            doc.open(f.name)
+            with pytest.raises(PDFParser.XREF_ERRORS):
+                doc.page_count
+
+            doc = PDFDoc()
+            doc.open(f.name, recover=True)
+            assert doc.catalog['Lang'] == 'en'
+            assert doc.page_count == 0
+
+            doc = PDFDoc()
+            metadata = doc.open_metadata(f.name, recover=True)
+            assert metadata == ('1.4', None, None, 0, False)
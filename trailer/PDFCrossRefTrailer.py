@@ -32,11 +32,11 @@ class PDFCrossRefTrailer(PDFTrailer):
             not be present in the stream, and the default value shall be
             used, if there is one. If the first element is zero, the
             type field shall not be present, and shall default to type 1.
-        xref_stream: The byte offset in the decoded stream from the
-            beginning of the file of a cross reference stream.
 
     """
 
+    KEYS = PDFTrailer.KEYS.union(['Type', 'Index', 'W'])
+
     def __init__(self, trailer_dict):
 
         super(PDFCrossRefTrailer, self).__init__(trailer_dict)
@@ -55,9 +55,3 @@ class PDFCrossRefTrailer(PDFTrailer):
 
         # shall be direct object
         return self.trailer_dict.get('W')
-
-    @property
-    def xref_stream(self):
-        """XRefStm value."""
-
-        return self.trailer_dict.get('XRefStm')
@@ -33,8 +33,16 @@ class PDFTrailer(object):
         offset: An integer representing the starting file position of
             the trailer.
 
+        xref_stream: The byte offset of a cross reference stream, in
+            the trailer of a hybrid-reference file.
+
     """
 
+    # keys of the trailer dictionary which are read, see
+    # PDFLexer.get_dictionary
+    KEYS = frozenset(['Size', 'Prev', 'Root', 'Encrypt', 'Info', 'ID',
+                      'XRefStm'])
+
     def __init__(self, trailer_dict):
 
         self.trailer_dict = trailer_dict
@@ -73,4 +81,10 @@ class PDFTrailer(object):
     def id(self):
         """An array of file identifier for the file."""
 
-        return self.trailer_dict.get('ID')
\ No newline at end of file
+        return self.trailer_dict.get('ID')
+
+    @property
+    def xref_stream(self):
+        """XRefStm value."""
+
+        return self.trailer_dict.get('XRefStm')
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+
+# standard library import
+from array import array
+from bisect import bisect_right
+
+# third party related import
+
+# local library import
+from pdfproto.xref.PDFCrossRefEntry import (PDFCrossRefEntry,
+                                            PDFCrossRefCompressedEntry)
+
+
+class PDFCrossRefIndexError(Exception): pass
+
+
+class PDFCrossRefIndex(object):
+    """Cross reference entries kept in typed arrays.
+
+    Entries are added subsection by subsection, and the object number
+    of an entry is the first object number of its subsection plus its
+    index in the subsection, so it is not stored. Each entry takes 13
+    bytes: a type, and two fields whose meaning depends on the type
+    (7.5.8.3 Table 18).
+
+    Reading an entry by index or iterating gives PDFCrossRefEntry or
+    PDFCrossRefCompressedEntry, as the lists of entries used to.
+
+    Subsections may also be added lazily, with a loader which parses
+    their entries on demand. get() parses only the entry it looks for,
+    and anything else which needs all entries loads them first.
+
+    Attributes:
+        types: A bytearray of entry types, FREE, IN_USE or COMPRESSED.
+        fields_1: An array of the byte offsets of objects in use, the
+            object numbers of the next free objects, or the object
+            numbers of the object streams.
+        fields_2: An array of the generation numbers, or the indices of
+            the objects in the object streams.
+
+    """
+
+    FREE = 0
+
+    IN_USE = 1
+
+    COMPRESSED = 2
+
+    # state of PDFCrossRefEntry -> type
+    STATE_TYPES = {'f': FREE, 'n': IN_USE}
+
+    def __init__(self):
+
+        self.types = bytearray()
+        self.fields_1 = array('l')
+        self.fields_2 = array('i')
+
+        # first object number and the index of the first entry of each
+        # subsection, in the order they are added
+        self._first_obj_nums = array('l')
+        self._starts = array('l')
+
+        # (first object number, number of entries, loader) of each
+        # subsection not loaded yet
+        self._lazy_subsections = []
+
+        # (first object number, number of entries, index of the first
+        # entry or None, index in _lazy_subsections) of each subsection,
+        # sorted by object number, and their first object numbers
+        self._ranges = None
+        self._range_obj_nums = None
+
+    def __len__(self):
+
+        return len(self.types) + sum(num_entries for _, num_entries, _
+                                     in self._lazy_subsections)
+
+    def __getitem__(self, ix):
+
+        self._load_lazy_subsections()
+
+        if ix < 0:
+            ix += len(self.types)
+
+        if not 0 <= ix < len(self.types):
+            raise IndexError('cross reference index out of range')
+
+        k = bisect_right(self._starts, ix) - 1
+        obj_num = self._first_obj_nums[k] + ix - self._starts[k]
+
+        return self._make_entry(ix, obj_num)
+
+    def __iter__(self):
+
+        for obj_num, start, end in self.subsections():
+            for ix in xrange(start, end):
+                yield self._make_entry(ix, obj_num + ix - start)
+
+    def subsections(self):
+        """Yields (first object number, start, end) of each subsection,
+        where start and end are the indices of its entries in types and
+        fields."""
+
+        self._load_lazy_subsections()
+
+        num_subsections = len(self._starts)
+
+        for k in xrange(num_subsections):
+            end = (self._starts[k + 1] if k + 1 < num_subsections
+                   else len(self.types))
+            yield (self._first_obj_nums[k], self._starts[k], end)
+
+    def _make_entry(self, ix, obj_num):
+        """Create the namedtuple view of an entry."""
+
+        return self.make_entry(obj_num, self.types[ix], self.fields_1[ix],
+                               self.fields_2[ix])
+
+    @classmethod
+    def make_entry(cls, obj_num, entry_type, field_1, field_2):
+        """Create the namedtuple view of the fields of an entry."""
+
+        if entry_type == cls.COMPRESSED:
+            return PDFCrossRefCompressedEntry(field_1, field_2, obj_num)
+
+        return PDFCrossRefEntry(field_1, obj_num, field_2,
+                                'n' if entry_type == cls.IN_USE else 'f')
+
+    def add_subsection(self, obj_num):
+        """Start a subsection, the entries added next are numbered from
+        obj_num."""
+
+        self._first_obj_nums.append(obj_num)
+        self._starts.append(len(self.types))
+        self._ranges = None
+
+    def add_lazy_subsection(self, obj_num, num_entries, loader):
+        """Add a subsection whose entries are parsed on demand.
+
+        Args:
+            obj_num: An integer of the first object number.
+            num_entries: An integer of the number of entries.
+            loader: A callable which takes the indices start and stop of
+                entries in the subsection, and returns the (types,
+                fields_1, fields_2) of these entries, types being a
+                bytearray.
+
+        """
+
+        self._lazy_subsections.append((obj_num, num_entries, loader))
+        self._ranges = None
+
+    def _load_lazy_subsections(self):
+        """Load the entries of all lazy subsections, in the order they
+        were added."""
+
+        if len(self._lazy_subsections) == 0:
+            return
+
+        lazy_subsections, self._lazy_subsections = self._lazy_subsections, []
+
+        for obj_num, num_entries, loader in lazy_subsections:
+            self.add_subsection(obj_num)
+            self.extend(*loader(0, num_entries))
+
+    def append(self, entry_type, field_1, field_2):
+        """Add an entry to the last subsection.
+
+        Args:
+            entry_type: FREE, IN_USE or COMPRESSED.
+            field_1: An integer, see fields_1.
+            field_2: An integer, see fields_2.
+
+        """
+
+        if len(self._starts) == 0:
+            raise PDFCrossRefIndexError('add_subsection should be called first')
+
+        self.types.append(entry_type)
+        self.fields_1.append(field_1)
+        self.fields_2.append(field_2)
+        self._ranges = None
+
+    def extend(self, types, fields_1, fields_2):
+        """Add entries to the last subsection.
+
+        Args:
+            types: A sequence of entry types.
+            fields_1: A sequence of integers, see fields_1.
+            fields_2: A sequence of integers, see fields_2.
+
+        """
+
+        if len(self._starts) == 0:
+            raise PDFCrossRefIndexError('add_subsection should be called first')
+
+        if not len(types) == len(fields_1) == len(fields_2):
+            raise PDFCrossRefIndexError('fields should be of the same length')
+
+        self.types.extend(types)
+        self.fields_1.extend(fields_1)
+        self.fields_2.extend(fields_2)
+        self._ranges = None
+
+    def get(self, obj_num):
+        """Get the entry of an object number.
+
+        Args:
+            obj_num: An integer of the object number.
+
+        Returns:
+            A PDFCrossRefEntry or a PDFCrossRefCompressedEntry, or None
+            if the object is not in the index.
+
+        """
+
+        fields = self.get_fields(obj_num)
+        if fields is None:
+            return None
+
+        return self.make_entry(obj_num, *fields)
+
+    def get_fields(self, obj_num):
+        """Get the type and the fields of the entry of an object number.
+
+        Args:
+            obj_num: An integer of the object number.
+
+        Returns:
+            A tuple (type, field 1, field 2), or None if the object is
+            not in the index.
+
+        """
+
+        if self._ranges is None:
+            self._build_ranges()
+
+        k = bisect_right(self._range_obj_nums, obj_num) - 1
+        if k < 0:
+            return None
+
+        first_obj_num, num_entries, start, lazy_ix = self._ranges[k]
+        if obj_num >= first_obj_num + num_entries:
+            return None
+
+        ix = obj_num - first_obj_num
+
+        # parse only the entry of a lazy subsection
+        if start is None:
+            loader = self._lazy_subsections[lazy_ix][2]
+            types, fields_1, fields_2 = loader(ix, ix + 1)
+            return types[0], fields_1[0], fields_2[0]
+
+        ix += start
+        return self.types[ix], self.fields_1[ix], self.fields_2[ix]
+
+    def _build_ranges(self):
+        """Sort subsections by object number for get()."""
+
+        num_subsections = len(self._starts)
+
+        ranges = []
+        for k in xrange(num_subsections):
+            end = (self._starts[k + 1] if k + 1 < num_subsections
+                   else len(self.types))
+            if end > self._starts[k]:
+                ranges.append((self._first_obj_nums[k], end - self._starts[k],
+                               self._starts[k], None))
+
+        for lazy_ix, (obj_num, num_entries, _) in enumerate(
+                self._lazy_subsections):
+            if num_entries > 0:
+                ranges.append((obj_num, num_entries, None, lazy_ix))
+
+        ranges.sort()
+
+        self._ranges = ranges
+        self._range_obj_nums = [r[0] for r in ranges]
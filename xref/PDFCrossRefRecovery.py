@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+
+# standard library import
+from array import array
+from bisect import bisect_right
+import logging as logger
+import re
+
+# third party related import
+
+# local library import
+from pdfproto.parser.PDFLexer import PDFLexer, PDFLexerError
+from pdfproto.parser.PDFObjectStream import (PDFObjectStream,
+                                             PDFObjectStreamError)
+from pdfproto.parser.pdf_objects import PDFStreamObject
+from pdfproto.trailer.PDFCrossRefTrailer import PDFCrossRefTrailer
+from pdfproto.trailer.PDFTrailer import PDFTrailer
+from pdfproto.xref.PDFCrossRefIndex import PDFCrossRefIndex
+from pdfproto.xref.PDFCrossRefTable import PDFCrossRefTable
+
+
+class PDFCrossRefRecoveryError(Exception): pass
+
+
+class PDFCrossRefRecovery:
+    """Cross reference entries rebuilt by scanning the whole file, for
+    files whose cross reference tables are broken.
+
+    The file is searched with regular expressions for object headers
+    "N G obj", keywords trailer and /Type /XRef, /ObjStm and /Catalog.
+    An object found more than once is the one nearest the end of file,
+    the newest one. Objects in the object streams found are
+    added as compressed entries, newer than the objects before the
+    stream.
+
+    The trailer is merged from the trailer dictionaries and the cross
+    reference stream dictionaries found, the later ones win. /Prev and
+    /XRefStm are dropped, /Size covers the objects found, and /Root is
+    the newest /Type /Catalog object if the trailers do not give one.
+
+    Attributes:
+        entries: An instance of PDFCrossRefIndex.
+        trailer: An instance of PDFTrailer
+
+    """
+
+    # an object header "N G obj", not in the middle of a token
+    RE_OBJECT = re.compile(
+            r'[\0\t\n\f\r ()<>\[\]{}/%]'
+            r'(\d{1,10})[\0\t\n\f\r ]+(\d{1,5})[\0\t\n\f\r ]+obj'
+            r'(?![^\0\t\n\f\r ()<>\[\]{}/%])')
+
+    # keyword trailer, and a /Type among XRef, ObjStm and Catalog. They
+    # are searched apart from the headers, as patterns starting with a
+    # literal are scanned much faster by re.
+    RE_TRAILER = re.compile(
+            r'trailer(?<=[\0\t\n\f\r ()<>\[\]{}/%]trailer)'
+            r'(?![^\0\t\n\f\r ()<>\[\]{}/%])')
+    RE_TYPE = re.compile(
+            r'/Type[\0\t\n\f\r ]*/(XRef|ObjStm|Catalog)'
+            r'(?![^\0\t\n\f\r ()<>\[\]{}/%])')
+
+    # trailer keys which chain to other cross reference tables
+    CHAIN_KEYS = frozenset(['Prev', 'XRefStm'])
+
+    def __init__(self):
+
+        self.entries = PDFCrossRefIndex()
+        self.trailer = None
+
+    def parse(self, parser):
+        """Scan the file. PDFCrossRefRecoveryError is raised if no
+        object is found.
+
+        Args:
+            parser: An instance of PDFParser
+
+        """
+
+        stream = parser.stream
+
+        # the lexer of the parser resolves indirect /Length through the
+        # cross reference table being rebuilt
+        lexer = PDFLexer(stream)
+
+        # (position, object number, generation number) in file order
+        headers = [(match_obj.start(1), int(match_obj.group(1)),
+                    int(match_obj.group(2)))
+                   for match_obj in self.RE_OBJECT.finditer(stream)]
+        header_positions = [header[0] for header in headers]
+
+        # object number -> (position, type, field 1, field 2)
+        objects = {}
+        for obj_pos, obj_num, gen_num in headers:
+            if obj_num <= PDFCrossRefTable.MAX_OBJECT_NUM:
+                objects[obj_num] = (obj_pos, PDFCrossRefIndex.IN_USE, obj_pos,
+                                    gen_num)
+
+        trailer_positions = [match_obj.end()
+                             for match_obj in self.RE_TRAILER.finditer(stream)]
+
+        xref_streams, obj_streams = [], []
+        catalog_ref = None
+
+        # a /Type belongs to the nearest object header before it
+        for match_obj in self.RE_TYPE.finditer(stream):
+            ix = bisect_right(header_positions, match_obj.start()) - 1
+            if ix < 0:
+                continue
+
+            obj_pos, obj_num, gen_num = headers[ix]
+            if match_obj.group(1) == 'XRef':
+                xref_streams.append(obj_pos)
+            elif match_obj.group(1) == 'ObjStm':
+                obj_streams.append((obj_num, obj_pos))
+            else:
+                catalog_ref = (obj_num, gen_num)
+
+        logger.debug('%d objects, %d trailers, %d xref streams, '
+                     '%d object streams found', len(objects),
+                     len(trailer_positions), len(xref_streams),
+                     len(obj_streams))
+
+        if not objects:
+            logger.error('no objects are found')
+            raise PDFCrossRefRecoveryError('Should have objects')
+
+        for obj_stream_num, obj_stream_pos in obj_streams:
+            self._load_object_stream(lexer, objects, obj_stream_num,
+                                     obj_stream_pos)
+
+        self._load_entries(objects)
+        self._load_trailer(lexer, objects, trailer_positions, xref_streams,
+                           catalog_ref)
+
+    def _load_object_stream(self, lexer, objects, obj_stream_num,
+                            obj_stream_pos):
+        """Add the objects of an object stream as compressed entries."""
+
+        # a newer object of the same number is not the stream
+        if objects.get(obj_stream_num, (None,))[0] != obj_stream_pos:
+            return
+
+        try:
+            stream_obj = lexer.get_indirect_object(obj_stream_pos).data
+            if not isinstance(stream_obj, PDFStreamObject):
+                return
+
+            obj_stream = PDFObjectStream(stream_obj)
+        except (PDFLexerError, PDFObjectStreamError), e:
+            logger.warn('object stream %s cannot be loaded', obj_stream_num)
+            return
+
+        for ix, obj_num in enumerate(obj_stream.object_nums):
+            if obj_num > PDFCrossRefTable.MAX_OBJECT_NUM:
+                continue
+
+            if objects.get(obj_num, (-1,))[0] < obj_stream_pos:
+                objects[obj_num] = (obj_stream_pos,
+                                    PDFCrossRefIndex.COMPRESSED,
+                                    obj_stream_num, ix)
+
+    def _load_entries(self, objects):
+        """Add the objects found as subsections of consecutive object
+        numbers."""
+
+        obj_nums = sorted(objects)
+        start = 0
+
+        while start < len(obj_nums):
+            end = start + 1
+            while (end < len(obj_nums) and
+                   obj_nums[end] == obj_nums[end - 1] + 1):
+                end += 1
+
+            types, fields_1, fields_2 = bytearray(), array('l'), array('i')
+            for obj_num in obj_nums[start:end]:
+                _, entry_type, field_1, field_2 = objects[obj_num]
+                types.append(entry_type)
+                fields_1.append(field_1)
+                fields_2.append(field_2)
+
+            self.entries.add_subsection(obj_nums[start])
+            self.entries.extend(types, fields_1, fields_2)
+
+            start = end
+
+    def _load_trailer(self, lexer, objects, trailer_positions, xref_streams,
+                      catalog_ref):
+        """Merge the trailer dictionaries found, in the order of the
+        file."""
+
+        trailer_dicts = []
+
+        for pos in trailer_positions:
+            try:
+                ch, ch_pos = lexer.get_next_token(pos)
+                trailer_dicts.append((pos, lexer.get_dictionary(
+                        ch_pos, PDFTrailer.KEYS).data))
+            except (PDFLexerError, IndexError), e:
+                logger.warn('trailer at %s cannot be parsed', pos)
+
+        for pos in xref_streams:
+            try:
+                stream_obj = lexer.get_indirect_object(
+                        pos, PDFCrossRefTrailer.KEYS).data
+            except PDFLexerError, e:
+                logger.warn('cross reference stream at %s cannot be parsed',
+                            pos)
+                continue
+
+            if isinstance(stream_obj, PDFStreamObject):
+                trailer_dicts.append((pos, stream_obj.stream_dict.data))
+
+        trailer_dicts.sort()
+
+        trailer_dict = {}
+        for _, d in trailer_dicts:
+            trailer_dict.update((key, value) for key, value in d.iteritems()
+                                if key in PDFTrailer.KEYS and
+                                key not in self.CHAIN_KEYS)
+
+        # 7.5.5
+        # Size is one greater than the highest object number
+        trailer_dict['Size'] = max(objects) + 1 if objects else 0
+
+        root = trailer_dict.get('Root')
+        if not isinstance(root, tuple) or root[0] not in objects:
+            if catalog_ref is None:
+                logger.warn('document catalog is not found')
+            else:
+                trailer_dict['Root'] = catalog_ref
+
+        self.trailer = PDFTrailer(trailer_dict)
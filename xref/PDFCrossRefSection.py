@@ -1,14 +1,19 @@
 #!/usr/bin/env python
 
 # standard library import
+from array import array
+from functools import partial
 import logging as logger
+import re
+import string
+import weakref
 
 # third party related import
 
 # local library import
 from pdfproto.parser.PDFLexer import PDFLexerError
 from pdfproto.trailer.PDFTrailer import PDFTrailer
-from pdfproto.xref.PDFCrossRefEntry import PDFCrossRefEntry
+from pdfproto.xref.PDFCrossRefIndex import PDFCrossRefIndex
 
 
 class PDFCrossRefSectionError(Exception): pass
@@ -18,51 +23,189 @@ class PDFCrossRefSection:
     """
 
     Attributes:
-        entries: A list of instances of PDFCrossRefEntry
+        entries: An instance of PDFCrossRefIndex.
         trailer: An instance of PDFTrailer
 
     """
 
+    # 7.5.4
+    # each entry is exactly 20 bytes long, including a 2-byte EOL
+    ENTRY_SIZE = 20
+
+    RE_ENTRY = re.compile(r'(\d{10}) (\d{5}) ([nf])(?: \r| \n|\r\n)')
+
+    # number of entries parsed at a time
+    BATCH_SIZE = 4096
+
+    # "n" and "f" -> PDFCrossRefIndex types
+    STATE_TYPES = string.maketrans('fn', chr(PDFCrossRefIndex.FREE) +
+                                         chr(PDFCrossRefIndex.IN_USE))
+
     def __init__(self):
 
-        self.entries = []
+        self.entries = PDFCrossRefIndex()
         self.trailer = None
 
-    def parse(self, parser, xref_pos):
+    def parse(self, parser, xref_pos, lazy=False):
         """Load cross reference section
 
         Args:
             parser: An instance of PDFParser
             xref_pos: An integer that cross reference table starts.
+            lazy: If True, the entries of well-formed subsections are
+                not parsed until they are looked up, only the headers
+                and the trailer are.
 
         """
 
         # test the 1st line must be keyword "xref"
-        for (line, pos) in parser.next_lines(xref_pos, ensure_pos=True):
-            if line != 'xref':
-                logger.error('Should be keyword xref')
-                raise PDFCrossRefSectionError('Should be keyword xref')
+        line, pos = parser.get_line(xref_pos)
+        if line != 'xref':
+            logger.error('Should be keyword xref')
+            raise PDFCrossRefSectionError('Should be keyword xref')
 
-            break
+        stream = parser.stream
 
-        obj_num, num_remaining = 0, 0
+        while True:
+            line_pos = pos
+            line, pos = parser.get_line(line_pos)
+            if line is None:
+                break
 
-        for (line, pos) in parser.next_lines(xref_pos + 5, ensure_pos=True):
             line = line.strip()
             if line == '':
                 continue
 
-            if num_remaining == 0:
-                if line == 'trailer':
-                    self._load_trailer(parser, pos)
-                    break
+            if line == 'trailer':
+                self._load_trailer(parser, line_pos)
+                break
 
-                obj_num, num_remaining = self._get_subsection_header(line)
-                if obj_num is None:
-                    logger.error('...%s...', parser.stream[pos:(pos + 10)])
-                    logger.error('Invalid cross reference subsection')
-                    raise PDFCrossRefSectionError()
+            obj_num, num_entries = self._get_subsection_header(line)
+            if obj_num is None:
+                logger.error('...%s...', stream[line_pos:(line_pos + 10)])
+                logger.error('Invalid cross reference subsection')
+                raise PDFCrossRefSectionError()
 
+            # skip over well-formed entries, they are at fixed positions;
+            # the loader refers to the parser weakly, as the parser keeps
+            # the entries
+            if lazy and num_entries > 0 and self._is_well_formed(
+                    stream, pos, num_entries):
+                self.entries.add_lazy_subsection(
+                        obj_num, num_entries,
+                        partial(self._read_subsection, weakref.proxy(parser),
+                                pos))
+                pos += num_entries * self.ENTRY_SIZE
+                continue
+
+            self.entries.add_subsection(obj_num)
+
+            # read well-formed entries at once, otherwise line by line
+            fields = self._read_entries(stream, pos, num_entries)
+            if fields is not None:
+                pos += num_entries * self.ENTRY_SIZE
+            else:
+                fields, pos = self._read_entry_lines(parser, pos, num_entries)
+
+            self.entries.extend(*fields)
+
+    def _is_well_formed(self, stream, entries_pos, num_entries):
+        """Test if the first and the last entries of a subsection are at
+        the positions of 20-byte entries."""
+
+        last_pos = entries_pos + (num_entries - 1) * self.ENTRY_SIZE
+
+        return (self.RE_ENTRY.match(stream, entries_pos) is not None and
+                self.RE_ENTRY.match(stream, last_pos) is not None)
+
+    def _read_subsection(self, parser, entries_pos, start, stop):
+        """Parse some entries of a subsection, the loader of the lazy
+        subsections.
+
+        Args:
+            parser: An instance of PDFParser
+            entries_pos: An integer of the position of the first entry.
+            start: An integer of the index of the first entry to parse.
+            stop: An integer of the index after the last entry to parse.
+
+        Returns:
+            A tuple (types, offsets, generation numbers).
+
+        """
+
+        fields = self._read_entries(parser.stream,
+                                    entries_pos + start * self.ENTRY_SIZE,
+                                    stop - start)
+        if fields is not None:
+            return fields
+
+        # some entries are not 20 bytes long, so the positions are not
+        # known before reading the lines
+        logger.debug('subsection at %s is not well-formed', entries_pos)
+
+        (types, offsets, generation_nums), _ = self._read_entry_lines(
+                parser, entries_pos, stop)
+
+        return types[start:], offsets[start:], generation_nums[start:]
+
+    def _read_entries(self, stream, entries_pos, num_entries):
+        """Parse the entries of a subsection in one sweep.
+
+        Args:
+            stream: A memory mapped file.
+            entries_pos: An integer of the position of the first entry.
+            num_entries: An integer of the number of entries.
+
+        Returns:
+            A tuple (types, offsets, generation numbers), or None if any
+            of the entries is not exactly 20 bytes long.
+
+        """
+
+        types, offsets, generation_nums = bytearray(), array('l'), array('i')
+
+        # every match is 20 bytes long, so as many matches as entries
+        # cover the data without gaps
+        for batch_start in xrange(0, num_entries, self.BATCH_SIZE):
+            batch_size = min(self.BATCH_SIZE, num_entries - batch_start)
+            pos = entries_pos + batch_start * self.ENTRY_SIZE
+            fields = self.RE_ENTRY.findall(
+                    stream[pos:(pos + batch_size * self.ENTRY_SIZE)])
+            if len(fields) != batch_size:
+                return None
+
+            batch_offsets, batch_generation_nums, batch_states = zip(*fields)
+            types.extend(''.join(batch_states).translate(self.STATE_TYPES))
+            offsets.extend(map(int, batch_offsets))
+            generation_nums.extend(map(int, batch_generation_nums))
+
+        return types, offsets, generation_nums
+
+    def _read_entry_lines(self, parser, entries_pos, num_entries):
+        """Parse the entries of a subsection line by line.
+
+        Args:
+            parser: An instance of PDFParser
+            entries_pos: An integer of the position of the first entry.
+            num_entries: An integer of the number of entries.
+
+        Returns:
+            A tuple ((types, offsets, generation numbers), position
+            after the last entry).
+
+        """
+
+        types, offsets, generation_nums = bytearray(), array('l'), array('i')
+        pos = entries_pos
+
+        while len(types) < num_entries:
+            line, pos = parser.get_line(pos)
+            if line is None:
+                logger.warn('Unexpected end of cross reference subsection')
+                break
+
+            line = line.strip()
+            if line == '':
                 continue
 
             offset, gen_num, state = self._get_subsection_body(line)
@@ -70,11 +213,16 @@ class PDFCrossRefSection:
                 logger.error('Invalid cross referrence subsection')
                 raise PDFCrossRefSectionError()
 
-            self.entries.append(PDFCrossRefEntry(offset, obj_num,
-                                                 gen_num, state))
+            entry_type = PDFCrossRefIndex.STATE_TYPES.get(state)
+            if entry_type is None:
+                logger.error('Invalid cross reference entry state: %s', state)
+                raise PDFCrossRefSectionError()
+
+            types.append(entry_type)
+            offsets.append(offset)
+            generation_nums.append(gen_num)
 
-            obj_num += 1
-            num_remaining -= 1
+        return (types, offsets, generation_nums), pos
 
     def _get_subsection_header(self, entry):
 
@@ -90,6 +238,11 @@ class PDFCrossRefSection:
             logger.exception(e)
             raise PDFCrossRefSectionError('Should be two integers')
 
+        if init_obj_num < 0 or num_obj < 0:
+            logger.error('Invalid cross reference subsection %s %s',
+                         init_obj_num, num_obj)
+            raise PDFCrossRefSectionError('Should be non-negative integers')
+
         return init_obj_num, num_obj
 
     def _get_subsection_body(self, entry):
@@ -119,13 +272,20 @@ class PDFCrossRefSection:
         """
 
         trailer_dict = None
+        next_pos = trailer_pos
+
+        while True:
+            pos = next_pos
+            line, next_pos = parser.get_line(pos)
+            if line is None:
+                break
 
-        for (line, pos) in parser.next_lines(trailer_pos, ensure_pos=True):
             if line == '':
                 continue
 
             try:
-                trailer_dict = parser.lexer.get_dictionary(pos)
+                trailer_dict = parser.lexer.get_dictionary(pos,
+                                                           PDFTrailer.KEYS)
                 break
             except PDFLexerError, e:
                 continue
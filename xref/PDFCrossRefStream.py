@@ -2,14 +2,15 @@
 
 # standard library import
 import logging as logger
+import struct
 
 # third party related import
 
 # local library import
 from pdfproto.parser.PDFLexer import PDFLexerError
+from pdfproto.parser.pdf_objects import PDFStreamObject
 from pdfproto.trailer.PDFCrossRefTrailer import PDFCrossRefTrailer
-from pdfproto.xref.PDFCrossRefEntry import (PDFCrossRefEntry,
-                                            PDFCrossRefCompressedEntry)
+from pdfproto.xref.PDFCrossRefIndex import PDFCrossRefIndex
 
 
 class PDFCrossRefStreamError(Exception): pass
@@ -19,15 +20,20 @@ class PDFCrossRefStream:
     """
 
     Attributes:
-        entries: A list of instances of PDFCrossRefEntry or
-            PDFCrossRefCompressedEntry.
+        entries: An instance of PDFCrossRefIndex.
         trailer: An instance of PDFTrailer
 
     """
 
+    # width of a field -> struct format of unsigned integers
+    FIELD_FORMATS = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+    # number of rows decoded at a time
+    BATCH_SIZE = 4096
+
     def __init__(self):
 
-        self.entries = []
+        self.entries = PDFCrossRefIndex()
         self.trailer = None
 
     def parse(self, parser, xref_pos):
@@ -40,65 +46,146 @@ class PDFCrossRefStream:
         """
 
         try:
-            stream = parser.lexer.get_indirect_object(xref_pos)
+            stream = parser.lexer.get_indirect_object(
+                    xref_pos, PDFCrossRefTrailer.KEYS)
         except PDFLexerError, e:
             logger.error('Should be an indirect object')
             raise PDFCrossRefStreamError('Should be an indirect object')
 
         stream = stream.data
+        if not isinstance(stream, PDFStreamObject):
+            logger.error('Should be a stream')
+            raise PDFCrossRefStreamError('Should be a stream')
 
         self.trailer = PDFCrossRefTrailer(stream.stream_dict.data)
+        if self.trailer.trailer_dict.get('Type') != 'XRef':
+            logger.error('Should be /Type /XRef')
+            raise PDFCrossRefStreamError('Should be /Type /XRef')
 
-        # get decoded data
-        xref_data = stream.get_decoded_data()
-        xref_data_ptr = 0
-
-        xref_size = self.trailer.size
         xref_index = self.trailer.index
-        xref_prev = self.trailer.prev
         xref_w = self.trailer.w
+        if not self._is_integers(xref_w) or len(xref_w) != 3:
+            logger.error('/W should be 3 non-negative integers')
+            raise PDFCrossRefStreamError('Invalid /W')
+
+        if not self._is_integers(xref_index) or len(xref_index) % 2 != 0:
+            logger.error('/Index should be pairs of non-negative integers')
+            raise PDFCrossRefStreamError('Invalid /Index')
+
+        # get decoded data, the filters raise errors of their own, eg.
+        # zlib.error
+        try:
+            xref_data = stream.get_decoded_data()
+        except Exception, e:
+            logger.error('cross reference stream cannot be decoded: %r', e)
+            raise PDFCrossRefStreamError('Should be a decodable stream')
+
+        xref_data_ptr = 0
         sum_w_bytes = sum(xref_w)
 
-        for i in xrange(0, len(xref_index), 2):
-            obj_num, num_remaining = xref_index[2 * i], xref_index[2 * i + 1]
-
-            while num_remaining > 0:
-                entry = xref_data[xref_data_ptr:(xref_data_ptr + sum_w_bytes)]
-                xref_data_ptr += sum_w_bytes
-
-                # Type field's default value is 1
-                if xref_w[0] == 0:
-                    entry_type = 1
-                else:
-                    entry_type = self._to_int(entry[:xref_w[0]])
-
-                field_1 = self._to_int(entry[xref_w[0]:(xref_w[0] + xref_w[1])])
-                field_2 = self._to_int(entry[(xref_w[0] + xref_w[1]):])
-
-                if entry_type == 0:
-                    entry = PDFCrossRefEntry(field_1, obj_num,
-                                             field_2, 'f')
-                elif entry_type == 1:
-                    entry = PDFCrossRefEntry(field_1, obj_num,
-                                             field_2, 'n')
-                elif entry_type == 2:
-                    entry = PDFCrossRefCompressedEntry(field_1, field_2,
-                                                       obj_num)
-                else:
-                    raise PDFCrossRefStreamError(('invalid cross reference'
-                                                  'stream entry type: %s'),
-                                                 entry_type)
-
-                self.entries.append(entry)
-                obj_num += 1
-                num_remaining -= 1
-
-    def _to_int(self, str_data):
-        """Convert multiple string bytes to integer.
-
-        >>> self._to_int('abc')
-        >>> 6382179
+        for i in xrange(0, len(xref_index) - 1, 2):
+            obj_num, num_entries = xref_index[i], xref_index[i + 1]
+            self.entries.add_subsection(obj_num)
+
+            end_ptr = xref_data_ptr + num_entries * sum_w_bytes
+            if end_ptr > len(xref_data):
+                logger.error('cross reference stream is too short')
+                raise PDFCrossRefStreamError('cross reference stream is too short')
+
+            self._load_rows(xref_data, xref_data_ptr, num_entries, xref_w)
+            xref_data_ptr = end_ptr
+
+    def _is_integers(self, values):
+        """Test if it is a list of non-negative integers."""
+
+        return isinstance(values, list) and all(
+                isinstance(value, (int, long)) and
+                not isinstance(value, bool) and value >= 0
+                for value in values)
+
+    def _load_rows(self, xref_data, start_ptr, num_rows, w):
+        """Decode the rows of a subsection and add them to entries.
+
+        Args:
+            xref_data: A string of the decoded stream.
+            start_ptr: An integer of the position of the first row.
+            num_rows: An integer of the number of rows.
+            w: A list of 3 integers, the widths of the fields.
+
+        """
+
+        sum_w_bytes = sum(w)
+
+        for batch_start in xrange(0, num_rows, self.BATCH_SIZE):
+            batch_size = min(self.BATCH_SIZE, num_rows - batch_start)
+            ptr = start_ptr + batch_start * sum_w_bytes
+            entry_types, fields_1, fields_2 = self._decode_rows(
+                    xref_data[ptr:(ptr + batch_size * sum_w_bytes)],
+                    batch_size, w)
+
+            # 7.5.8.3
+            # 0, 1 and 2 are the only types defined
+            if entry_types and max(entry_types) > PDFCrossRefIndex.COMPRESSED:
+                raise PDFCrossRefStreamError(('invalid cross reference'
+                                              'stream entry type: %s'),
+                                             max(entry_types))
+
+            self.entries.extend(entry_types, fields_1, fields_2)
+
+    def _decode_rows(self, data, num_rows, w):
+        """Decode the fields of rows with one struct.unpack.
+
+        A field of 1, 2, 4 or 8 bytes is decoded as a single unsigned
+        big-endian integer. Fields of other widths, eg. 3 bytes, are
+        split into such parts which are combined afterwards.
+
+        Args:
+            data: A string of the rows.
+            num_rows: An integer of the number of rows.
+            w: A list of 3 integers, the widths of the fields.
+
+        Returns:
+            A (types, fields_1, fields_2) tuple of lists of integers.
 
         """
 
-        return reduce(lambda x, y: x * 256 + y, map(ord, str_data))
+        row_format = []
+        parts = []
+        for width in w:
+            field_parts = self._split_width(width)
+            row_format.extend(self.FIELD_FORMATS[part] for part in field_parts)
+            parts.append(field_parts)
+
+        values = struct.unpack('>' + ''.join(row_format) * num_rows, data)
+        num_columns = len(row_format)
+
+        fields = []
+        column = 0
+        for ix, field_parts in enumerate(parts):
+            if len(field_parts) == 0:
+                # Type field's default value is 1, and the others are 0
+                fields.append([1 if ix == 0 else 0] * num_rows)
+                continue
+
+            field = values[column::num_columns]
+            column += 1
+            for part in field_parts[1:]:
+                field = map(lambda high, low: (high << (8 * part)) | low,
+                            field, values[column::num_columns])
+                column += 1
+
+            fields.append(field)
+
+        return tuple(fields)
+
+    def _split_width(self, width):
+        """Split a field width into widths of FIELD_FORMATS, from the
+        high-order part."""
+
+        ret = []
+        for part in (8, 4, 2, 1):
+            while width >= part:
+                ret.append(part)
+                width -= part
+
+        return ret
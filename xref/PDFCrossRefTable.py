@@ -1,61 +1,335 @@
 #!/usr/bin/env python
 
 # standard library import
+from array import array
 import logging as logger
 
 # third party related import
 
 # local library import
-from PDFCrossRenEntry import PDFCrossRefEntry, PDFCrossRefCompressedEntry
+from pdfproto.xref.PDFCrossRefEntry import (PDFCrossRefEntry,
+                                            PDFCrossRefCompressedEntry)
+from pdfproto.xref.PDFCrossRefIndex import PDFCrossRefIndex
 
 
 class PDFCrossRefTableError(Exception): pass
 
 
-class PDFCrossRefTable:
+class PDFCrossRefTable(object):
+    """The cross reference table of a whole document.
 
-    def __init__(self, lexer):
+    The entries of all cross reference sections and streams are merged,
+    and the newest entry of an object number wins. Entries are kept in
+    arrays indexed by object number, like PDFCrossRefIndex.
 
-        self.lexer = lexer
-        self.objects = {}
+    A lazy table keeps the merged xrefs and searches them, the newest
+    first, on the first lookup of each object number. If the xrefs are
+    given as an iterator, an older xref is taken from it only when the
+    newer ones do not have the object looked up.
+
+    Attributes:
+        trailers: A list of instances of PDFTrailer, the newest first.
+            A lazy table lists only the xrefs taken so far.
+        trailer: The newest trailer, or None.
+
+    """
+
+    # type of the object numbers without entry
+    ABSENT = 0xff
+
+    # Annex C.2, the largest object number, which bounds the arrays
+    MAX_OBJECT_NUM = 8388607
+
+    def __init__(self, lazy=False):
+        """
+        Args:
+            lazy: If True, entries are merged when they are looked up.
+
+        """
+
+        self.lazy = lazy
         self.trailers = []
 
-    def _add_object(self, obj_num, gen_num, offset):
+        # (PDFCrossRefIndex, skip free entries) of the xrefs not merged
+        # yet, and the iterator of the xrefs not taken yet
+        self._pending = []
+        self._more_xrefs = None
 
-        obj_key = (entry.object_num, entry.generation_num)
+        # the entries of a hybrid-reference section whose free entries
+        # wait for its XRefStm stream
+        self._held_free = None
 
-        if obj_key in self.objects:
-            logger.warn('(%s, %s) already exists', *obj_key)
-            return
+        # the largest Size of the trailers
+        self._size = 0
+
+        self._types = bytearray()
+        self._fields_1 = array('l')
+        self._fields_2 = array('i')
+
+    @property
+    def trailer(self):
 
-        self.objects[obj_key] = offset
+        return self.trailers[0] if self.trailers else None
+
+    def __len__(self):
+        """The number of objects in use."""
+
+        self._merge_pending()
+
+        return (len(self._types) -
+                self._types.count(chr(PDFCrossRefIndex.FREE)) -
+                self._types.count(chr(self.ABSENT)))
 
     def merge_xrefs(self, xrefs):
+        """Merge cross reference sections and streams.
+
+        Args:
+            xrefs: A list or an iterator of instances of
+                PDFCrossRefSection or PDFCrossRefStream, the newest
+                first, as returned by PDFParser.get_xref or
+                PDFParser.iter_xref. Entries of object numbers which are
+                already in the table are ignored, so xrefs older than
+                those already merged may be merged later.
+
+        """
+
+        if not self.lazy:
+            for xref in xrefs:
+                self._add_xref(xref)
+
+            self._release_free()
+
+            return
+
+        # take the newest one for the trailer, the others when needed
+        self._merge_more_xrefs()
+        self._more_xrefs = iter(xrefs)
+        self._take_xref()
+
+    def _take_xref(self):
+        """Take the next xref of a lazy table.
+
+        Returns:
+            False if there are no more xrefs.
+
+        """
+
+        if self._more_xrefs is None:
+            return False
+
+        xref = next(self._more_xrefs, None)
+        if xref is None:
+            self._more_xrefs = None
+            return self._release_free()
+
+        self._add_xref(xref)
+
+        return True
+
+    def _merge_more_xrefs(self):
+        """Take all the xrefs of a lazy table."""
+
+        while self._take_xref():
+            pass
+
+    def _add_xref(self, xref):
+        """Merge an xref, or keep it for lookups in a lazy table."""
+
+        self.trailers.append(xref.trailer)
+
+        # the arrays grow as far as the object numbers listed, or looked
+        # up in a lazy table, within the largest Size
+        if (xref.trailer is not None and
+                isinstance(xref.trailer.size, (int, long))):
+            if xref.trailer.size > self.MAX_OBJECT_NUM + 1:
+                logger.error('/Size %s is too large', xref.trailer.size)
+                raise PDFCrossRefTableError('Should be at most %d objects' %
+                                            (self.MAX_OBJECT_NUM + 1))
+
+            self._size = max(self._size, xref.trailer.size)
+
+        # 7.5.8.4
+        # a hybrid-reference file may list the objects of its
+        # XRefStm stream as free in the table, so these free
+        # entries shall not hide the stream ones. They still hide the
+        # older sections, so they are added right after the stream,
+        # which follows the section, and before /Prev.
+        held_free = self._held_free
+        self._held_free = None
+
+        if xref.trailer is not None and xref.trailer.xref_stream is not None:
+            self._add_entries(xref.entries, True)
+            self._held_free = xref.entries
+        else:
+            self._add_entries(xref.entries, False)
+
+        if held_free is not None:
+            self._add_entries(held_free, False)
+
+    def _add_entries(self, entries, skip_free):
+        """Merge the entries of an xref, or keep them for lookups in a
+        lazy table."""
+
+        if self.lazy:
+            self._pending.append((entries, skip_free))
+        else:
+            self._merge_entries(entries, skip_free)
+
+    def _release_free(self):
+        """Add the free entries of the last hybrid-reference section,
+        whose XRefStm stream is missing.
+
+        Returns:
+            True if there were such entries.
+
+        """
+
+        if self._held_free is None:
+            return False
+
+        self._add_entries(self._held_free, False)
+        self._held_free = None
+
+        return True
+
+    def _merge_pending(self):
+        """Merge all the xrefs of a lazy table."""
+
+        self._merge_more_xrefs()
+        pending, self._pending = self._pending, []
+
+        for entries, skip_free in pending:
+            self._merge_entries(entries, skip_free)
+
+    def _merge_entries(self, entries, skip_free):
+        """Add the entries of an PDFCrossRefIndex which are not in the
+        table yet."""
+
+        types, fields_1, fields_2 = self._types, self._fields_1, self._fields_2
+        absent, free = self.ABSENT, PDFCrossRefIndex.FREE
+
+        for first_obj_num, start, end in entries.subsections():
+            if first_obj_num + end - start > self.MAX_OBJECT_NUM + 1:
+                logger.error('object %s is out of range',
+                             first_obj_num + end - start - 1)
+                raise PDFCrossRefTableError('Should be at most object %d' %
+                                            self.MAX_OBJECT_NUM)
+
+            self._grow(first_obj_num + end - start)
+
+            for ix in xrange(start, end):
+                obj_num = first_obj_num + ix - start
+                if types[obj_num] != absent:
+                    continue
+
+                entry_type = entries.types[ix]
+                if entry_type == free and skip_free:
+                    continue
+
+                types[obj_num] = entry_type
+                fields_1[obj_num] = entries.fields_1[ix]
+                fields_2[obj_num] = entries.fields_2[ix]
+
+    def _grow(self, size):
+        """Make the arrays hold at least size object numbers."""
+
+        num_more = size - len(self._types)
+        if num_more <= 0:
+            return
+
+        self._types.extend(chr(self.ABSENT) * num_more)
+        self._fields_1.extend(array('l', [0]) * num_more)
+        self._fields_2.extend(array('i', [0]) * num_more)
+
+    def lookup(self, obj_num, gen_num=None):
+        """Find the entry of an object.
+
+        Args:
+            obj_num: An integer of the object number.
+            gen_num: An integer of the generation number. If it is
+                given, the entry is returned only if the generation
+                matches. Objects in object streams have generation 0.
+
+        Returns:
+            A PDFCrossRefEntry whose state is "n", a
+            PDFCrossRefCompressedEntry, or None if the object is free
+            or not in the table.
+
+        """
+
+        if obj_num < 0:
+            return None
+
+        if len(self._types) <= obj_num < self._size and self._is_pending():
+            self._grow(obj_num + 1)
+
+        if obj_num < len(self._types):
+            entry_type = self._types[obj_num]
+            if entry_type == self.ABSENT and self._is_pending():
+                self._resolve(obj_num)
+                entry_type = self._types[obj_num]
+
+            field_1, field_2 = self._fields_1[obj_num], self._fields_2[obj_num]
+        elif self._is_pending():
+            # beyond Size, so it is not kept
+            entry_type, field_1, field_2 = self._find_pending(obj_num)
+        else:
+            return None
+
+        if entry_type == PDFCrossRefIndex.IN_USE:
+            if gen_num is not None and gen_num != field_2:
+                return None
+
+            return PDFCrossRefEntry(field_1, obj_num, field_2, 'n')
+        elif entry_type == PDFCrossRefIndex.COMPRESSED:
+            if gen_num is not None and gen_num != 0:
+                return None
+
+            return PDFCrossRefCompressedEntry(field_1, field_2, obj_num)
+
+        return None
+
+    def _is_pending(self):
+        """Test if a lazy table has xrefs not merged yet."""
+
+        return len(self._pending) > 0 or self._more_xrefs is not None
+
+    def _find_pending(self, obj_num):
+        """Search the xrefs not merged yet for the newest entry of an
+        object number.
+
+        Returns:
+            A tuple (type, field 1, field 2), whose type is ABSENT if no
+            xref has the object.
+
+        """
+
+        ix = 0
+
+        while ix < len(self._pending) or self._take_xref():
+            entries, skip_free = self._pending[ix]
+            ix += 1
+
+            fields = entries.get_fields(obj_num)
+            if fields is None:
+                continue
 
-        for xref in xrefs:
-            self.trailers.append(xref.trailer)
+            if fields[0] == PDFCrossRefIndex.FREE and skip_free:
+                continue
 
-            for entry in xref.entries:
-                if isinstance(entry, PDFCrossRefEntry):
-                    if entry.object_num == 0:
-                        continue
+            return fields
 
-                    if entry.state == 'n':
-                        self._add_object(entry.object_num,
-                                         entry.generation_num,
-                                         entry)
+        return self.ABSENT, 0, 0
 
-                    elif entry.state == 'f':
-                        for g in xrange(entry.generation_num + 1):
-                            self._add_object(entry.object_num,
-                                             entry.generation_num,
-                                             None)
-                    else:
-                        logger.error('unknown entry.state = %s', entry.state)
+    def _resolve(self, obj_num):
+        """Keep the newest entry of an object number of a lazy table."""
 
-                elif isinstance(entry, PDFCrossRefCompressedEntry):
-                    self._add_object(entry.object_num, 0, entry)
+        entry_type, field_1, field_2 = self._find_pending(obj_num)
 
-                else:
-                    logger.error('not a valid xref entry %s', entry)
+        # nothing to search next time either
+        if entry_type == self.ABSENT:
+            entry_type = PDFCrossRefIndex.FREE
 
+        self._types[obj_num] = entry_type
+        self._fields_1[obj_num] = field_1
+        self._fields_2[obj_num] = field_2
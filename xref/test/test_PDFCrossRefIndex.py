@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+# standard library imports
+
+# third party related imports
+import pytest
+
+# local library imports
+from pdfproto.xref.PDFCrossRefEntry import (PDFCrossRefEntry,
+                                            PDFCrossRefCompressedEntry)
+from pdfproto.xref.PDFCrossRefIndex import *
+
+
+class TestPDFCrossRefIndex:
+
+    def test_entries(self):
+
+        index = PDFCrossRefIndex()
+
+        with pytest.raises(PDFCrossRefIndexError):
+            index.append(PDFCrossRefIndex.IN_USE, 0, 0)
+
+        index.add_subsection(30)
+        index.append(PDFCrossRefIndex.IN_USE, 25777, 0)
+        index.add_subsection(0)
+        index.extend('\x00\x02\x01', [0, 7, 2 ** 40], [65535, 3, 2])
+        index.add_subsection(10)
+
+        entries = [
+                PDFCrossRefEntry(25777, 30, 0, 'n'),
+                PDFCrossRefEntry(0, 0, 65535, 'f'),
+                PDFCrossRefCompressedEntry(7, 3, 1),
+                PDFCrossRefEntry(2 ** 40, 2, 2, 'n'),
+        ]
+
+        assert len(index) == 4
+        assert list(index) == entries
+        assert [index[ix] for ix in xrange(-4, 4)] == entries * 2
+
+        with pytest.raises(IndexError):
+            index[4]
+
+        with pytest.raises(PDFCrossRefIndexError):
+            index.extend('\x01', [1, 2], [0])
+
+    def test_get(self):
+
+        index = PDFCrossRefIndex()
+        index.add_subsection(23)
+        index.extend('\x01\x01', [25518, 25635], [2, 0])
+        index.add_subsection(0)
+        index.append(PDFCrossRefIndex.FREE, 0, 65535)
+        index.add_subsection(3)
+
+        assert index.get(0) == PDFCrossRefEntry(0, 0, 65535, 'f')
+        assert index.get(24) == PDFCrossRefEntry(25635, 24, 0, 'n')
+        assert index.get(1) is None
+        assert index.get(3) is None
+        assert index.get(25) is None
+
+        index.append(PDFCrossRefIndex.IN_USE, 25325, 0)
+        assert index.get(3) == PDFCrossRefEntry(25325, 3, 0, 'n')
+
+    def test_lazy_subsection(self):
+
+        loaded = []
+
+        def loader(start, stop):
+            loaded.append((start, stop))
+            return (bytearray('\x01' * (stop - start)),
+                    range(start * 10, stop * 10, 10), [0] * (stop - start))
+
+        index = PDFCrossRefIndex()
+        index.add_subsection(0)
+        index.append(PDFCrossRefIndex.FREE, 0, 65535)
+        index.add_lazy_subsection(5, 4, loader)
+
+        assert len(index) == 5
+        assert index.get(7) == PDFCrossRefEntry(20, 7, 0, 'n')
+        assert index.get(9) is None
+        assert index.get(4) is None
+        assert loaded == [(2, 3)]
+
+        assert list(index) == [
+                PDFCrossRefEntry(0, 0, 65535, 'f'),
+                PDFCrossRefEntry(0, 5, 0, 'n'),
+                PDFCrossRefEntry(10, 6, 0, 'n'),
+                PDFCrossRefEntry(20, 7, 0, 'n'),
+                PDFCrossRefEntry(30, 8, 0, 'n'),
+        ]
+        assert loaded == [(2, 3), (0, 4)]
+        assert len(index) == 5
+        assert index.get(8) == PDFCrossRefEntry(30, 8, 0, 'n')
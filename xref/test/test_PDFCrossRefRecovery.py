@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+# standard library imports
+from contextlib import closing
+from tempfile import NamedTemporaryFile
+import zlib
+
+# third party related imports
+import pytest
+
+# local library imports
+from pdfproto.parser.PDFParser import PDFParser
+from pdfproto.xref.PDFCrossRefEntry import (PDFCrossRefEntry,
+                                            PDFCrossRefCompressedEntry)
+from pdfproto.xref.PDFCrossRefRecovery import (PDFCrossRefRecovery,
+                                               PDFCrossRefRecoveryError)
+
+
+class TestPDFCrossRefRecovery:
+
+    def parse(self, content):
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(content)
+            f.flush()
+
+            p = PDFParser()
+            p.open(f.name)
+
+            recovery = PDFCrossRefRecovery()
+            recovery.parse(p)
+
+            return recovery
+
+    def test_parse(self):
+
+        content = '%PDF-1.4\n'
+        offsets = {}
+        for obj_num, obj in [(1, '<</Type /Catalog /Pages 2 0 R>>'),
+                             (2, '<</Type /Pages /Kids [] /Count 0>>'),
+                             (5, '(x5 0 obj)'),
+                             (2, '<</Type /Pages /Kids [] /Count 1>>')]:
+            offsets[obj_num] = len(content)
+            content += '%d 0 obj\n%s\nendobj\n' % (obj_num, obj)
+
+        content += 'trailer\n<</Size 3 /Root 1 0 R /Info 9 0 R /Prev 7>>\n'
+        content += 'trailer\n<</Size 3 /Root 1 0 R /ID [<01> <02>]>>\n'
+        content += 'startxref\n0\n%%EOF\n'
+
+        recovery = self.parse(content)
+
+        # the newest object 2 wins, "x5 0 obj" is not a header
+        entries = recovery.entries
+        assert list(entries.subsections()) == [(1, 0, 2), (5, 2, 3)]
+        assert entries.get_fields(1) == (1, offsets[1], 0)
+        assert entries.get_fields(2) == (1, offsets[2], 0)
+        assert entries.get_fields(5) == (1, offsets[5], 0)
+
+        trailer = recovery.trailer
+        assert trailer.size == 6
+        assert trailer.root == (1, 0)
+        assert trailer.info == (9, 0)
+        assert trailer.id == ['\x01', '\x02']
+        assert trailer.prev is None
+
+    def test_parse_empty(self):
+
+        # nothing but a trailer
+        with pytest.raises(PDFCrossRefRecoveryError):
+            self.parse('%PDF-1.4\ntrailer\n<</Size 1>>\n%%EOF\n')
+
+    def test_parse_catalog(self):
+
+        content = ('%PDF-1.4\n'
+                   '1 0 obj\n<</Type /Catalog /Pages 3 0 R>>\nendobj\n'
+                   '2 0 obj\n<</Pages 3 0 R/Type/Catalog>>\nendobj\n'
+                   '3 0 obj\n<</Type /Pages /Kids [] /Count 0>>\nendobj\n')
+
+        # no trailer, the newest catalog is the root
+        recovery = self.parse(content)
+        assert recovery.trailer.root == (2, 0)
+        assert recovery.trailer.size == 4
+
+    def test_parse_object_stream(self):
+
+        header = '2 0 3 13 '
+        obj_stream = zlib.compress(header + '<</Index 0>> <</Index 1>>')
+
+        content = '%PDF-1.5\n3 0 obj\n<</Old true>>\nendobj\n'
+        content += ('1 0 obj\n<</Type /ObjStm /N 2 /First %d '
+                   '/Filter /FlateDecode /Length %d>>\nstream\n%s\n'
+                   'endstream\nendobj\n' % (len(header), len(obj_stream),
+                                            obj_stream))
+        obj_pos = len(content)
+        content += '2 0 obj\n<</New true>>\nendobj\n'
+
+        # object 2 is newer than the stream, object 3 older
+        entries = self.parse(content).entries
+        assert entries.get_fields(2) == (1, obj_pos, 0)
+        assert entries.get_fields(3) == (2, 1, 1)
+
+    def test_parse_object_stream_corrupt(self):
+
+        content = ('%PDF-1.5\n1 0 obj\n<</Type /ObjStm /N 1 /First 4 '
+                   '/Filter /FlateDecode /Length 4>>\nstream\n\xff\xff\xff\xff\n'
+                   'endstream\nendobj\n'
+                   '2 0 obj\n<</Type /Catalog>>\nendobj\n')
+
+        # the stream is skipped, and kept as an object
+        recovery = self.parse(content)
+        assert list(recovery.entries.subsections()) == [(1, 0, 2)]
+        assert recovery.entries.get_fields(1) == (1, 9, 0)
+        assert recovery.trailer.root == (2, 0)
+
+    def test_recover_not_xref(self):
+
+        content = ('%PDF-1.4\n'
+                   '1 0 obj\n<</Type /Catalog /Pages 2 0 R>>\nendobj\n'
+                   '2 0 obj\n<</Type /Pages /Kids [] /Count 0>>\nendobj\n')
+
+        # startxref points to a stream which is not a xref stream
+        xref_pos = len(content)
+        content += '3 0 obj\n<</Length 3>>\nstream\nabc\nendstream\nendobj\n'
+        content += 'startxref\n%d\n%%%%EOF\n' % xref_pos
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(content)
+            f.flush()
+
+            p = PDFParser()
+            p.open(f.name)
+            with pytest.raises(PDFParser.XREF_ERRORS):
+                p.get_xref_table()
+
+            p = PDFParser(recover=True)
+            p.open(f.name)
+            xref_table = p.get_xref_table()
+            assert xref_table.trailer.root == (1, 0)
+            assert xref_table.lookup(3) == PDFCrossRefEntry(xref_pos, 3, 0, 'n')
+
+    def test_recover(self):
+
+        objects = ['<</Type /Catalog /Pages 2 0 R>>',
+                   '<</Type /Pages /Kids [] /Count 0>>',
+                   '<</Length 4 0 R>>\nstream\nabc\nendstream',
+                   '3']
+
+        content = '%PDF-1.4\n'
+        for obj_num, obj in enumerate(objects, 1):
+            content += '%d 0 obj\n%s\nendobj\n' % (obj_num, obj)
+
+        # startxref points to nowhere
+        content += 'trailer\n<</Size 5 /Root 1 0 R>>\n'
+        content += 'startxref\n%d\n%%%%EOF\n' % len(content)
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(content)
+            f.flush()
+
+            p = PDFParser()
+            p.open(f.name)
+            with pytest.raises(PDFParser.XREF_ERRORS):
+                p.get_object(1, 0)
+
+            p = PDFParser(recover=True)
+            p.open(f.name)
+            assert p.trailer.root == (1, 0)
+            assert p.get_object(2, 0).data['Type'] == 'Pages'
+            assert p.get_object(3, 0).raw_data == 'abc'
+            assert isinstance(p.xref_table.lookup(4), PDFCrossRefEntry)
+            assert not isinstance(p.xref_table.lookup(4),
+                                  PDFCrossRefCompressedEntry)
@@ -7,12 +7,14 @@ import random
 from tempfile import NamedTemporaryFile
 
 # third party related imports
+import pytest
 
 # local library imports
 from pdfproto.parser.PDFParser import PDFParser
 from pdfproto.trailer.PDFTrailer import PDFTrailer
 from pdfproto.xref.PDFCrossRefEntry import PDFCrossRefEntry
-from pdfproto.xref.PDFCrossRefSection import PDFCrossRefSection
+from pdfproto.xref.PDFCrossRefSection import (PDFCrossRefSection,
+                                              PDFCrossRefSectionError)
 
 
 class TestPDFCrossRefSection:
@@ -99,6 +101,81 @@ trailer
 
                 assert xref.trailer.trailer_dict == {}
 
+    def test_parse_4(self):
+
+        # 20-byte entries, and a subsection with a 19-byte entry
+        test_data = ('xref\r\n'
+                     '0 3\r\n'
+                     '0000000000 65535 f\r\n'
+                     '0000000017 00000 n \n'
+                     '0000000081 00001 n \r'
+                     '7 2\n'
+                     '0000000331 00000 n\n'
+                     '0000000409 00000 n\r\n'
+                     '9 0\r\n'
+                     'trailer\r\n'
+                     '<</Size 9>>')
+
+        entries = [
+                PDFCrossRefEntry(0, 0, 65535, 'f'),
+                PDFCrossRefEntry(17, 1, 0, 'n'),
+                PDFCrossRefEntry(81, 2, 1, 'n'),
+                PDFCrossRefEntry(331, 7, 0, 'n'),
+                PDFCrossRefEntry(409, 8, 0, 'n'),
+        ]
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(test_data)
+            f.flush()
+
+            parser = PDFParser()
+            parser.open(f.name)
+
+            xref = PDFCrossRefSection()
+            xref.parse(parser, 0)
+
+            assert list(xref.entries) == entries
+            assert xref.trailer.size == 9
+
+    def test_parse_lazy(self):
+
+        # the 20-byte subsection is lazy, the other one is parsed
+        test_data = ('xref\r\n'
+                     '0 3\r\n'
+                     '0000000000 65535 f\r\n'
+                     '0000000017 00000 n \n'
+                     '0000000081 00001 n \r'
+                     '7 2\n'
+                     '0000000331 00000 n\n'
+                     '0000000409 00000 n\r\n'
+                     'trailer\r\n'
+                     '<</Size 9>>')
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(test_data)
+            f.flush()
+
+            parser = PDFParser()
+            parser.open(f.name)
+
+            xref = PDFCrossRefSection()
+            xref.parse(parser, 0, lazy=True)
+
+            assert xref.trailer.size == 9
+            assert len(xref.entries.types) == 2
+            assert xref.entries.get(2) == PDFCrossRefEntry(81, 2, 1, 'n')
+            assert xref.entries.get(8) == PDFCrossRefEntry(409, 8, 0, 'n')
+            assert len(xref.entries.types) == 2
+
+            assert len(xref.entries) == 5
+            assert list(xref.entries) == [
+                    PDFCrossRefEntry(331, 7, 0, 'n'),
+                    PDFCrossRefEntry(409, 8, 0, 'n'),
+                    PDFCrossRefEntry(0, 0, 65535, 'f'),
+                    PDFCrossRefEntry(17, 1, 0, 'n'),
+                    PDFCrossRefEntry(81, 2, 1, 'n'),
+            ]
+
     def test_parse_3(self):
 
         test_data = """\
@@ -141,3 +218,21 @@ trailer
         assert trailer.root == (2, 0)
         assert trailer.info == (1, 0)
         assert trailer.id == ['test 1', 'test 2']
+
+    def test_parse_negative(self):
+
+        # a padded header line of 20 bytes
+        for header in ['0 -1               \r\n', '-1 1               \r\n']:
+            test_data = ('xref\n' + header + '0000000000 65535 f\r\n'
+                         'trailer\n<<>>')
+
+            with closing(NamedTemporaryFile()) as f:
+                f.write(test_data)
+                f.flush()
+
+                parser = PDFParser()
+                parser.open(f.name)
+
+                for lazy in [False, True]:
+                    with pytest.raises(PDFCrossRefSectionError):
+                        PDFCrossRefSection().parse(parser, 0, lazy)
@@ -7,13 +7,15 @@ import random
 from tempfile import NamedTemporaryFile
 
 # third party related imports
+import pytest
 
 # local library imports
 from pdfproto.parser.PDFParser import PDFParser
 from pdfproto.trailer.PDFTrailer import PDFTrailer
 from pdfproto.xref.PDFCrossRefEntry import (PDFCrossRefEntry,
                                             PDFCrossRefCompressedEntry)
-from pdfproto.xref.PDFCrossRefStream import PDFCrossRefStream
+from pdfproto.xref.PDFCrossRefStream import (PDFCrossRefStream,
+                                             PDFCrossRefStreamError)
 
 
 class TestPDFCrossRefStream:
@@ -46,14 +48,14 @@ endobj
 
         entries = (
                 PDFCrossRefEntry(3722, 2, 0, 'n'),
-                PDFCrossRefCompressedEntry(3, 2, 0),
-                PDFCrossRefCompressedEntry(4, 2, 1),
-                PDFCrossRefCompressedEntry(5, 2, 2),
-                PDFCrossRefCompressedEntry(6, 2, 3),
-                PDFCrossRefCompressedEntry(7, 2, 4),
-                PDFCrossRefCompressedEntry(8, 2, 5),
-                PDFCrossRefCompressedEntry(9, 2, 6),
-                PDFCrossRefCompressedEntry(10, 2, 7),
+                PDFCrossRefCompressedEntry(2, 0, 3),
+                PDFCrossRefCompressedEntry(2, 1, 4),
+                PDFCrossRefCompressedEntry(2, 2, 5),
+                PDFCrossRefCompressedEntry(2, 3, 6),
+                PDFCrossRefCompressedEntry(2, 4, 7),
+                PDFCrossRefCompressedEntry(2, 5, 8),
+                PDFCrossRefCompressedEntry(2, 6, 9),
+                PDFCrossRefCompressedEntry(2, 7, 10),
                 PDFCrossRefEntry(4899, 11, 0, 'n'),
         )
 
@@ -80,3 +82,83 @@ endobj
 
                 for ix, entry in enumerate(xref.entries):
                     assert entry == entries[ix]
+
+    def test_parse_2(self):
+
+        test_data = """\
+1 0 obj
+<<
+    /Type /XRef
+    /Size 30
+    /Index [0 2 20 1 25 2]
+    /W [%s]
+    /Filter /ASCIIHexDecode
+>>
+stream
+%s
+endstream
+endobj
+"""
+
+        entries = [
+                PDFCrossRefEntry(0, 0, 65535, 'f'),
+                PDFCrossRefEntry(70000, 1, 0, 'n'),
+                PDFCrossRefCompressedEntry(1, 9, 20),
+                PDFCrossRefEntry(17, 25, 0, 'n'),
+                PDFCrossRefCompressedEntry(1, 0, 26),
+        ]
+
+        rows = (
+            ('1 3 2', '00 000000 FFFF 01 011170 0000 02 000001 0009 '
+                      '01 000011 0000 02 000001 0000'),
+            ('0 8 1', '0000000000000000 FF 0000000000011170 00 '
+                      '0000000000000001 09 0000000000000011 00 '
+                      '0000000000000001 00'),
+        )
+
+        for w, data in rows:
+            with closing(NamedTemporaryFile()) as f:
+                f.write(test_data % (w, data))
+                f.flush()
+
+                parser = PDFParser()
+                parser.open(f.name)
+
+                xref = PDFCrossRefStream()
+                xref.parse(parser, 0)
+
+                if w.startswith('0'):
+                    # without the type field, all entries are in use
+                    assert [e.offset for e in xref.entries] == \
+                           [0, 70000, 1, 17, 1]
+                    assert [e.generation_num for e in xref.entries] == \
+                           [255, 0, 9, 0, 0]
+                else:
+                    assert list(xref.entries) == entries
+
+    def test_parse_invalid(self):
+
+        test_data = """\
+1 0 obj
+<<%s /Size 2 /Length 12>>
+stream
+000000000000
+endstream
+endobj
+"""
+
+        for stream_dict in ['/Length 3',
+                            '/Type /XRef /W [1 2]',
+                            '/Type /XRef /W [1 -2 1]',
+                            '/Type /XRef /W [1 2 1] /Index [0]',
+                            '/Type /XRef /W [1 2 1] /Filter /FlateDecode',
+                            '/Type /XRef /W [1 2 1] /Filter /NoSuchDecode']:
+            with closing(NamedTemporaryFile()) as f:
+                f.write(test_data % stream_dict)
+                f.flush()
+
+                parser = PDFParser()
+                parser.open(f.name)
+
+                with pytest.raises(PDFCrossRefStreamError):
+                    PDFCrossRefStream().parse(parser, 0)
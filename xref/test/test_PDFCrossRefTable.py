@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+
+# standard library imports
+from contextlib import closing
+from tempfile import NamedTemporaryFile
+
+# third party related imports
+import pytest
+
+# local library imports
+from pdfproto.parser.PDFParser import PDFParser
+from pdfproto.xref.PDFCrossRefEntry import (PDFCrossRefEntry,
+                                            PDFCrossRefCompressedEntry)
+from pdfproto.xref.PDFCrossRefIndex import PDFCrossRefIndex
+from pdfproto.xref.PDFCrossRefTable import (PDFCrossRefTable,
+                                            PDFCrossRefTableError)
+
+
+class FakeXRef:
+
+    def __init__(self, trailer, entries):
+
+        self.trailer = trailer
+        self.entries = entries
+
+
+class FakeTrailer:
+
+    def __init__(self, size=None, xref_stream=None):
+
+        self.size = size
+        self.xref_stream = xref_stream
+
+
+class TestPDFCrossRefTable:
+
+    def test_merge_xrefs_1(self):
+
+        # original file and an incremental update
+        first_xref = """\
+xref
+0 4
+0000000000 65535 f
+0000000010 00000 n
+0000000020 00000 n
+0000000030 00000 n
+trailer
+<</Size 4>>
+"""
+        second_xref = """\
+xref
+0 1
+0000000000 65535 f
+2 1
+0000000000 00001 f
+3 2
+0000000300 00001 n
+0000000400 00000 n
+trailer
+<</Size 5 /Prev %d>>
+"""
+        test_data = first_xref + second_xref % 0
+        startxref = 'startxref\n%d\n%%%%EOF\n' % len(first_xref)
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(test_data + startxref)
+            f.flush()
+
+            parser = PDFParser()
+            parser.open(f.name)
+
+            xref_table = parser.get_xref_table()
+
+            assert len(xref_table.trailers) == 2
+            assert xref_table.trailer.size == 5
+            assert len(xref_table) == 3
+
+            assert xref_table.lookup(0) is None
+            assert xref_table.lookup(1) == PDFCrossRefEntry(10, 1, 0, 'n')
+            assert xref_table.lookup(1, 0) == PDFCrossRefEntry(10, 1, 0, 'n')
+            assert xref_table.lookup(1, 1) is None
+            assert xref_table.lookup(2) is None
+            assert xref_table.lookup(3, 1) == PDFCrossRefEntry(300, 3, 1, 'n')
+            assert xref_table.lookup(3, 0) is None
+            assert xref_table.lookup(4) == PDFCrossRefEntry(400, 4, 0, 'n')
+            assert xref_table.lookup(5) is None
+            assert xref_table.lookup(-1) is None
+
+    def test_merge_xrefs_lazy(self):
+
+        test_data = """\
+xref
+0 3
+0000000000 65535 f\r
+0000000010 00000 n\r
+0000000020 00000 n\r
+trailer
+<</Size 3>>
+"""
+        update = """\
+xref
+2 2
+0000000200 00001 n\r
+0000000300 00000 n\r
+trailer
+<</Size 4 /Prev 0>>
+startxref
+%d
+%%%%EOF
+"""
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(test_data + update % len(test_data))
+            f.flush()
+
+            parser = PDFParser()
+            parser.open(f.name)
+
+            xref_table = parser.get_xref_table(lazy=True)
+
+            assert xref_table.lookup(2) == PDFCrossRefEntry(200, 2, 1, 'n')
+            assert xref_table.lookup(1) == PDFCrossRefEntry(10, 1, 0, 'n')
+            assert xref_table.lookup(0) is None
+            assert xref_table.lookup(9) is None
+            assert len(xref_table) == 3
+            assert xref_table.lookup(3) == PDFCrossRefEntry(300, 3, 0, 'n')
+
+    def test_merge_xrefs_2(self):
+
+        # a hybrid-reference section lists the objects of its XRefStm as
+        # free, the stream entries follow it in the list
+        section_entries = PDFCrossRefIndex()
+        section_entries.add_subsection(0)
+        section_entries.extend([0, 1, 0], [0, 100, 0], [65535, 0, 0])
+
+        stream_entries = PDFCrossRefIndex()
+        stream_entries.add_subsection(2)
+        stream_entries.append(PDFCrossRefIndex.COMPRESSED, 7, 3)
+
+        xref_table = PDFCrossRefTable()
+        xref_table.merge_xrefs([
+            FakeXRef(FakeTrailer(3, 500), section_entries),
+            FakeXRef(FakeTrailer(), stream_entries),
+        ])
+
+        assert xref_table.lookup(1) == PDFCrossRefEntry(100, 1, 0, 'n')
+        assert xref_table.lookup(2) == PDFCrossRefCompressedEntry(7, 3, 2)
+        assert xref_table.lookup(2, 0) == PDFCrossRefCompressedEntry(7, 3, 2)
+        assert xref_table.lookup(2, 1) is None
+        assert xref_table.trailer.xref_stream == 500
+
+    def test_merge_xrefs_hybrid(self):
+
+        # the newest hybrid-reference section deletes object 3, its
+        # XRefStm lists object 4, and object 3 is in use before
+        section_entries = PDFCrossRefIndex()
+        section_entries.add_subsection(0)
+        section_entries.extend([0, 1, 0, 0, 0], [0, 100, 0, 0, 0],
+                               [65535, 0, 0, 1, 0])
+
+        stream_entries = PDFCrossRefIndex()
+        stream_entries.add_subsection(4)
+        stream_entries.append(PDFCrossRefIndex.COMPRESSED, 7, 0)
+
+        old_entries = PDFCrossRefIndex()
+        old_entries.add_subsection(3)
+        old_entries.append(PDFCrossRefIndex.IN_USE, 300, 0)
+
+        for lazy in [False, True]:
+            xref_table = PDFCrossRefTable(lazy)
+            xref_table.merge_xrefs(iter([
+                FakeXRef(FakeTrailer(5, 500), section_entries),
+                FakeXRef(FakeTrailer(), stream_entries),
+                FakeXRef(FakeTrailer(4), old_entries),
+            ]))
+
+            assert xref_table.lookup(3) is None
+            assert xref_table.lookup(4) == PDFCrossRefCompressedEntry(7, 0, 4)
+            assert xref_table.lookup(1) == PDFCrossRefEntry(100, 1, 0, 'n')
+            assert len(xref_table) == 2
+
+    def test_merge_xrefs_bounds(self):
+
+        entries = PDFCrossRefIndex()
+        entries.add_subsection(1)
+        entries.append(PDFCrossRefIndex.IN_USE, 10, 0)
+
+        # a Size much larger than the objects listed allocates nothing
+        xref_table = PDFCrossRefTable()
+        xref_table.merge_xrefs([FakeXRef(FakeTrailer(8388608), entries)])
+        assert len(xref_table._types) == 2
+        assert xref_table.lookup(8388607) is None
+
+        for lazy in [False, True]:
+            with pytest.raises(PDFCrossRefTableError):
+                PDFCrossRefTable(lazy).merge_xrefs(
+                        [FakeXRef(FakeTrailer(100000000), entries)])
+
+        entries = PDFCrossRefIndex()
+        entries.add_subsection(8388608)
+        entries.append(PDFCrossRefIndex.IN_USE, 10, 0)
+
+        with pytest.raises(PDFCrossRefTableError):
+            PDFCrossRefTable().merge_xrefs([FakeXRef(FakeTrailer(), entries)])
+
+    def test_get_xref_table_size(self):
+
+        content = '%PDF-1.4\n1 0 obj\n<</Type /Catalog>>\nendobj\n'
+        xref_pos = len(content)
+        content += ('xref\n0 2\n0000000000 65535 f\r\n0000000009 00000 n\r\n'
+                    'trailer\n<</Size 100000000 /Root 1 0 R>>\n'
+                    'startxref\n%d\n%%%%EOF\n' % xref_pos)
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(content)
+            f.flush()
+
+            parser = PDFParser()
+            parser.open(f.name)
+            with pytest.raises(PDFCrossRefTableError):
+                parser.get_xref_table()
+
+            # the table is rebuilt from the objects found
+            parser = PDFParser(recover=True)
+            parser.open(f.name)
+            xref_table = parser.get_xref_table()
+            assert xref_table.trailer.size == 2
+            assert xref_table.lookup(1) == PDFCrossRefEntry(9, 1, 0, 'n')
+
+    def test_get_xref_loop(self):
+
+        # Prev points at the section itself
+        test_data = """\
+xref
+0 2
+0000000000 65535 f
+0000000010 00000 n
+trailer
+<</Size 2 /Prev 0>>
+startxref
+0
+%%EOF
+"""
+
+        with closing(NamedTemporaryFile()) as f:
+            f.write(test_data)
+            f.flush()
+
+            parser = PDFParser()
+            parser.open(f.name)
+
+            xrefs = parser.get_xref(parser.get_xref_pos())
+
+            assert len(xrefs) == 1